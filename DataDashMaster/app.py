@@ -1,176 +1,80 @@
-import streamlit as st
 import os
+import re
+
+import streamlit as st
 
-# Configure page
-st.set_page_config(
-    page_title="Car Service & Analytics Platform",
-    page_icon="🚗",
-    layout="wide",
-    initial_sidebar_state="expanded"
+# Example diagnostic queries
+_LUX = (
+    "BMW 3 Series making grinding noise when braking",
+    "Mercedes-Benz E-Class check engine light keeps coming on",
+    "Audi A4 air conditioning not cooling properly",
+    "Tesla Model 3 battery draining too quickly",
+    "Porsche 911 strange noise during acceleration"
+)
+_COMMON = (
+    "Toyota Corolla won't start in cold weather",
+    "Honda Civic pulling to the left when driving",
+    "Ford F-150 rough idle and stalling",
+    "Volkswagen Golf transmission slipping when shifting",
+    "Hyundai Tucson air bag warning light on dashboard"
 )
 
-# Custom CSS for a luxury look and feel
-st.markdown("""
-<style>
-    /* Gold accent color for luxury feel */
-    :root {
-        --primary-color: #d4af37;
-        --secondary-bg: #f8f9fa;
-        --dark-text: #14151a;
-    }
-    
-    /* Title and headers styling */
-    h1, h2, h3 {
-        color: var(--dark-text);
-        font-family: 'Playfair Display', serif;
-        font-weight: 600;
-    }
-    
-    /* Gold accents */
-    .gold-accent {
-        color: var(--primary-color);
-        font-weight: 600;
-    }
-    
-    /* Cards for features */
-    .feature-card {
-        background-color: white;
-        border-radius: 10px;
-        padding: 20px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        margin-bottom: 20px;
-    }
-    
-    /* Button styling */
-    .css-1x8cf1d {
-        background-color: var(--primary-color);
-        color: white;
-        font-weight: 600;
-    }
-    
-    /* Sidebar styling */
-    .css-1lcbmhc {
-        background-color: #14151a;
-    }
-    
-    .css-1lcbmhc .css-10trblm {
-        color: white;
-    }
-    
-    .css-1lcbmhc .css-16idsys p {
-        color: rgba(255, 255, 255, 0.8);
-    }
-    
-    /* Link styling */
-    a {
-        color: var(--primary-color);
-        text-decoration: none;
-        font-weight: 500;
-    }
-    
-    a:hover {
-        text-decoration: underline;
-    }
-    
-    /* Custom button styling */
-    .custom-button {
-        display: inline-block;
-        background-color: var(--primary-color);
-        color: white;
-        padding: 10px 20px;
-        text-align: center;
-        border-radius: 8px;
-        text-decoration: none;
-        font-weight: 600;
-        margin-top: 10px;
-        transition: all 0.3s ease;
-    }
-    
-    .custom-button:hover {
-        background-color: #c09c2c;
-        text-decoration: none;
-    }
-    
-    /* Two-column container */
-    .two-column {
-        display: flex;
-        gap: 20px;
-    }
-    
-    .column {
-        flex: 1;
-    }
-    
-    /* Responsive adjustments */
-    @media (max-width: 768px) {
-        .two-column {
-            flex-direction: column;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
 
-# Create a two-column layout
-col1, col2 = st.columns([2, 1])
+# Feature highlights for the two car service app pages
+_CHATBOT_FEATURES = (
+    "Natural language processing for vehicle issues",
+    "Support for 41+ car brands and their models",
+    "Detailed diagnostic information with severity indicators",
+    "Cost estimates and DIY possibility assessment",
+    "Beautiful responsive interface optimized for mobile",
+    "Multi-language support including Arabic"
+)
+_HEALTH_FEATURES = (
+    "Real-time vehicle health metrics and status",
+    "AI-powered anomaly detection with alerts",
+    "Component-level diagnostics and insights",
+    "Customized maintenance recommendations",
+    "Interactive visualization of health trends",
+    "Brand and model-specific insights"
+)
+
+@st.cache_resource(show_spinner=False)
+def _bullets(items: tuple) -> str:
+    return "\n".join(f"- *{p}*" for p in items)
+
+
+# The landing page CSS lives in static/styles.css but is inlined rather than linked:
+# Streamlit's Tornado static file server (1.44 included) sends .css as text/plain with
+# nosniff, so browsers would ignore a <link>ed stylesheet
+@st.cache_resource(show_spinner=False)
+def _styles_html():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "styles.css"), encoding="utf-8") as f:
+        return f"<style>{f.read()}</style>"
+
+
+def _minify_html(html):
+    """Drop HTML comments and the indentation/newlines between tags."""
+    html = re.sub(r"<!--.*?-->", "", html, flags=re.S)
+    return re.sub(r">\s*\n\s*<", "><", html).strip()
 
-with col1:
-    st.title("Car Service Diagnostic Platform")
-    st.markdown("""
-    <p style='font-size: 1.2em;'>
-    An advanced dual-application platform combining <span class='gold-accent'>AI-powered car diagnostics</span> with 
-    <span class='gold-accent'>sophisticated data analytics</span> capabilities.
-    </p>
-    """, unsafe_allow_html=True)
-    
-    # Main app description
-    st.markdown("""
-    ## Dual Platform Structure
-    This platform consists of two integrated applications:
-    
-    ### 1. Car Service Application (Port 8080)
-    A mobile-optimized application providing:
-    - AI-powered car diagnostics with realistic solutions
-    - Maintenance center finder with interactive maps
-    - Roadside assistance service
-    - Appointment scheduling system
-    
-    ### 2. Data Analytics Dashboard (Port 5000)
-    A Streamlit-powered dashboard for:
-    - Custom report generation
-    - Data visualization tools
-    - Integration with various data sources
-    - Advanced analytics capabilities
-    """)
 
 # Direct access buttons for both applications
-st.markdown("""
+@st.cache_resource(show_spinner=False)
+def _launcher_html(host):
+    return _minify_html(f"""
+<link rel="preconnect" href="http://{host}:8080">
 <div class='two-column'>
     <div class='column feature-card'>
         <h3>🚗 Car Service App</h3>
         <p>Mobile-optimized car diagnostic app with AI-powered solutions</p>
-        <a href='//' class='custom-button' id='carAppBtn'>Launch Car Service App</a>
+        <a href='http://{host}:8080' class='custom-button' id='carAppBtn'>Launch Car Service App</a>
         <br><br>
         <p><strong>Direct access to key features:</strong></p>
         <ul>
-            <li><a href='//' id='chatbotBtn'>AI Diagnostic Chatbot</a></li>
-            <li><a href='//' id='centersBtn'>Maintenance Centers</a></li>
-            <li><a href='//' id='mapBtn'>Interactive Map</a></li>
+            <li><a href='http://{host}:8080/chatbot' id='chatbotBtn'>AI Diagnostic Chatbot</a></li>
+            <li><a href='http://{host}:8080/maintenance-centers' id='centersBtn'>Maintenance Centers</a></li>
+            <li><a href='http://{host}:8080/map' id='mapBtn'>Interactive Map</a></li>
         </ul>
-        
-        <script>
-            // Generate the correct URLs based on the current host
-            document.addEventListener('DOMContentLoaded', function() {
-                // Get the host without the port
-                const hostParts = window.location.host.split(':');
-                const hostname = hostParts[0];
-                
-                // Update the URLs with the correct hostname and port 8080
-                document.getElementById('carAppBtn').href = 'http://' + hostname + ':8080';
-                document.getElementById('chatbotBtn').href = 'http://' + hostname + ':8080/chatbot';
-                document.getElementById('centersBtn').href = 'http://' + hostname + ':8080/maintenance-centers';
-                document.getElementById('mapBtn').href = 'http://' + hostname + ':8080/map';
-            });
-        </script>
     </div>
     
     <div class='column feature-card'>
@@ -186,212 +90,227 @@ st.markdown("""
         </ul>
     </div>
 </div>
-""", unsafe_allow_html=True)
+""")
 
-# Key Features Section
-st.header("Key Platform Features")
 
-# Create two columns for the features
-feature_col1, feature_col2 = st.columns(2)
+# Static sections kept as HTML files under assets/
+_ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
 
-with feature_col1:
-    st.markdown("""
-    <div class="feature-card">
-        <h3>🤖 AI Diagnostic Chatbot</h3>
-        <ul>
-            <li><strong>Natural Language Understanding</strong>: Describe problems in everyday language</li>
-            <li><strong>Multi-language Support</strong>: Works in both English and Arabic</li>
-            <li><strong>41+ Car Brands</strong>: Support for all major vehicle manufacturers</li>
-            <li><strong>Model-Specific Solutions</strong>: Tailored to your exact vehicle</li>
-            <li><strong>Severity Indicators</strong>: Visual indicators of problem urgency</li>
-            <li><strong>Cost Estimates</strong>: Approximate repair costs for budgeting</li>
-            <li><strong>DIY vs Professional</strong>: Clear guidance on what you can fix yourself</li>
-            <li><strong>Tools & Parts Lists</strong>: What you need for DIY repairs</li>
-            <li><strong>Time Estimates</strong>: Expected repair duration</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
 
-with feature_col2:
-    st.markdown("""
-    <div class="feature-card">
-        <h3>📊 Data Analytics Tools</h3>
-        <ul>
-            <li><strong>Multiple Data Sources</strong>: Connect to databases, APIs, CSVs</li>
-            <li><strong>Custom Dashboards</strong>: Build interactive visualizations</li>
-            <li><strong>Reports</strong>: Generate and schedule exportable reports</li>
-            <li><strong>Data Transformation</strong>: Clean and prepare your data</li>
-            <li><strong>API Documentation</strong>: Access data programmatically</li>
-            <li><strong>Real-time Updates</strong>: Live data refreshing</li>
-            <li><strong>User Management</strong>: Control access to dashboards</li>
-            <li><strong>Export Functionality</strong>: Download as Excel, CSV, or PDF</li>
-            <li><strong>Responsive Design</strong>: Works on all devices</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
-
-# Example section
-st.header("Example Diagnostic Queries")
-
-# Create columns for examples
-example_col1, example_col2 = st.columns(2)
-
-with example_col1:
-    st.subheader("Luxury Vehicles")
-    example_problems_luxury = [
-        "BMW 3 Series making grinding noise when braking",
-        "Mercedes-Benz E-Class check engine light keeps coming on",
-        "Audi A4 air conditioning not cooling properly",
-        "Tesla Model 3 battery draining too quickly",
-        "Porsche 911 strange noise during acceleration"
-    ]
-    
-    for problem in example_problems_luxury:
-        st.markdown(f"- *{problem}*")
-
-with example_col2:
-    st.subheader("Common Vehicles")
-    example_problems_common = [
-        "Toyota Corolla won't start in cold weather",
-        "Honda Civic pulling to the left when driving",
-        "Ford F-150 rough idle and stalling",
-        "Volkswagen Golf transmission slipping when shifting",
-        "Hyundai Tucson air bag warning light on dashboard"
-    ]
-    
-    for problem in example_problems_common:
-        st.markdown(f"- *{problem}*")
+@st.cache_resource(show_spinner=False)
+def _static_block(html_file):
+    with open(os.path.join(_ASSETS_DIR, html_file), encoding="utf-8") as f:
+        return _minify_html(f.read())
+
+
+# Sidebar navigation and about section
+@st.cache_resource(show_spinner=False)
+def _sidebar_html(host):
+    return f"""
+# Navigation
+
+### Analytics Platform (Port 5000)
+- [Analytics Home](/)
+- [Data Sources](/Data_Sources)
+- [Dashboard Builder](/Dashboard_Builder)
+- [Reports](/Reports)
+- [Data Transformation](/Data_Transformation)
+- [API Documentation](/API_Documentation)
+
+### Car Service App (Port 8080)
+- <a href="http://{host}:8080" id="homeLink">Car App Home</a>
+- <a href="http://{host}:8080/chatbot" id="chatbotLink">Diagnostic Chatbot</a>
+- <a href="http://{host}:8080/maintenance-centers" id="centersLink">Maintenance Centers</a>
+- <a href="http://{host}:8080/map" id="mapLink">Interactive Map</a>
+- <a href="http://{host}:8080/settings" id="settingsLink">User Settings</a>
+
+---
+## About the Platform
 
-# Mobile optimization
-st.header("Mobile-First Design Philosophy")
-st.markdown("""
 <div class="feature-card">
-    <p>Both applications in this platform are fully optimized for mobile devices with:</p>
-    <div class="two-column">
-        <div class="column">
+
+This dual-platform system combines a powerful data analytics dashboard with a user-friendly mobile car diagnostic application.
+
+The analytics dashboard (port 5000) enables creating custom reports and visualizations, while the car service app (port 8080) provides AI-powered diagnostic solutions and maintenance services.
+
+Both applications operate independently but can share data for integrated operations.
+
+</div>
+"""
+
+
+# Chatbot and vehicle health details shown under the screenshots
+@st.cache_resource(show_spinner=False)
+def _app_details_html(host):
+    chatbot_items = "\n".join(f"<li>{f}</li>" for f in _CHATBOT_FEATURES)
+    health_items = "\n".join(f"<li>{f}</li>" for f in _HEALTH_FEATURES)
+    return _minify_html(f"""
+<div class="two-column">
+    <div class="column">
+        <h3>AI-Powered Car Diagnostic Chatbot</h3>
+        <div class="feature-card">
+            <p>The diagnostic chatbot features:</p>
             <ul>
-                <li><strong>Responsive layouts</strong> that adjust to any screen size</li>
-                <li><strong>Touch-friendly interface</strong> with appropriately sized elements</li>
-                <li><strong>Fast loading times</strong> optimized for mobile connections</li>
-                <li><strong>Offline capabilities</strong> for basic functionality</li>
+{chatbot_items}
             </ul>
         </div>
-        <div class="column">
+        <p><strong>URL:</strong> <a href='http://{host}:8080/chatbot' id='chatbotUrl'>Open Chatbot</a></p>
+    </div>
+    <div class="column">
+        <h3>Vehicle Health Monitoring Dashboard</h3>
+        <div class="feature-card">
+            <p>The health monitoring dashboard provides:</p>
             <ul>
-                <li><strong>Progressive loading</strong> to prioritize critical content</li>
-                <li><strong>Dark theme options</strong> for battery conservation</li>
-                <li><strong>Reduced data usage</strong> through optimized assets</li>
-                <li><strong>Location-aware features</strong> for maintenance centers</li>
+{health_items}
             </ul>
         </div>
+        <p><strong>URL:</strong> <a href='http://{host}:8080/vehicle-health' id='healthUrl'>Open Vehicle Health Monitor</a></p>
     </div>
 </div>
-""", unsafe_allow_html=True)
+""")
 
-# Platform Screenshots
-st.header("Platform Screenshots")
 
-st.markdown("""
-<div class="feature-card">
-    <div class="two-column">
-        <div class="column">
-            <h3>Car Service App</h3>
-            <p>The mobile-optimized car service application featuring the AI diagnostic chatbot with enhanced results displaying severity indicators, cost estimates, and DIY badges.</p>
-        </div>
-        <div class="column">
-            <h3>Analytics Dashboard</h3>
-            <p>The Streamlit-powered data analytics platform allowing users to create custom visualizations, reports, and dashboards from multiple data sources.</p>
-        </div>
-    </div>
+def _car_app_host():
+    """Hostname the browser used to reach this page, without the port.
+
+    Resolved on the first run of a session and kept in session state, so
+    reruns go straight to the cached HTML blobs.
+    """
+    if "_car_app_host" not in st.session_state:
+        st.session_state["_car_app_host"] = st.context.headers.get("Host", "localhost").split(":")[0]
+    return st.session_state["_car_app_host"]
+
+
+@st.fragment
+def landing():
+    host = _car_app_host()
+
+    # Custom CSS for a luxury look and feel, from static/styles.css
+    st.markdown(_styles_html(), unsafe_allow_html=True)
+
+    # Two-column layout: platform overview on the left, right column left open
+    col1_html = """
+<div class='two-column'>
+<div class='column' style='flex: 2;'>
+
+# Car Service Diagnostic Platform
+
+<p style='font-size: 1.2em;'>
+An advanced dual-application platform combining <span class='gold-accent'>AI-powered car diagnostics</span> with 
+<span class='gold-accent'>sophisticated data analytics</span> capabilities.
+</p>
+
+## Dual Platform Structure
+This platform consists of two integrated applications:
+
+### 1. Car Service Application (Port 8080)
+A mobile-optimized application providing:
+- AI-powered car diagnostics with realistic solutions
+- Maintenance center finder with interactive maps
+- Roadside assistance service
+- Appointment scheduling system
+
+### 2. Data Analytics Dashboard (Port 5000)
+A Streamlit-powered dashboard for:
+- Custom report generation
+- Data visualization tools
+- Integration with various data sources
+- Advanced analytics capabilities
+
+</div>
+<div class='column'></div>
+</div>
+"""
+    st.markdown(col1_html, unsafe_allow_html=True)
+
+    # Direct access buttons for both applications
+    st.markdown(_launcher_html(host), unsafe_allow_html=True)
+
+    # Key Features Section, two feature cards side by side
+    st.markdown("""
+## Key Platform Features
+
+<div class="two-column">
+<div class="column feature-card">
+    <h3>🤖 AI Diagnostic Chatbot</h3>
+    <ul>
+        <li><strong>Natural Language Understanding</strong>: Describe problems in everyday language</li>
+        <li><strong>Multi-language Support</strong>: Works in both English and Arabic</li>
+        <li><strong>41+ Car Brands</strong>: Support for all major vehicle manufacturers</li>
+        <li><strong>Model-Specific Solutions</strong>: Tailored to your exact vehicle</li>
+        <li><strong>Severity Indicators</strong>: Visual indicators of problem urgency</li>
+        <li><strong>Cost Estimates</strong>: Approximate repair costs for budgeting</li>
+        <li><strong>DIY vs Professional</strong>: Clear guidance on what you can fix yourself</li>
+        <li><strong>Tools & Parts Lists</strong>: What you need for DIY repairs</li>
+        <li><strong>Time Estimates</strong>: Expected repair duration</li>
+    </ul>
+</div>
+<div class="column feature-card">
+    <h3>📊 Data Analytics Tools</h3>
+    <ul>
+        <li><strong>Multiple Data Sources</strong>: Connect to databases, APIs, CSVs</li>
+        <li><strong>Custom Dashboards</strong>: Build interactive visualizations</li>
+        <li><strong>Reports</strong>: Generate and schedule exportable reports</li>
+        <li><strong>Data Transformation</strong>: Clean and prepare your data</li>
+        <li><strong>API Documentation</strong>: Access data programmatically</li>
+        <li><strong>Real-time Updates</strong>: Live data refreshing</li>
+        <li><strong>User Management</strong>: Control access to dashboards</li>
+        <li><strong>Export Functionality</strong>: Download as Excel, CSV, or PDF</li>
+        <li><strong>Responsive Design</strong>: Works on all devices</li>
+    </ul>
+</div>
 </div>
 """, unsafe_allow_html=True)
 
-# Display rich information about our applications
-screenshot_col1, screenshot_col2 = st.columns(2)
+    # Example section, luxury and common vehicles side by side
+    st.markdown(f"""
+## Example Diagnostic Queries
 
-with screenshot_col1:
-    st.subheader("AI-Powered Car Diagnostic Chatbot")
-    st.info("""
-    The diagnostic chatbot features:
-    
-    • Natural language processing for vehicle issues
-    • Support for 41+ car brands and their models
-    • Detailed diagnostic information with severity indicators
-    • Cost estimates and DIY possibility assessment
-    • Beautiful responsive interface optimized for mobile
-    • Multi-language support including Arabic
-    """)
-    st.markdown("**URL:** <a href='#' id='chatbotUrl'>Open Chatbot</a>", unsafe_allow_html=True)
-
-with screenshot_col2:
-    st.subheader("Vehicle Health Monitoring Dashboard")
-    st.info("""
-    The health monitoring dashboard provides:
-    
-    • Real-time vehicle health metrics and status
-    • AI-powered anomaly detection with alerts
-    • Component-level diagnostics and insights
-    • Customized maintenance recommendations
-    • Interactive visualization of health trends
-    • Brand and model-specific insights
-    """)
-    st.markdown("**URL:** <a href='#' id='healthUrl'>Open Vehicle Health Monitor</a>", unsafe_allow_html=True)
-
-st.sidebar.title("Navigation")
-
-# Streamlit Data Analytics Navigation
-st.sidebar.markdown("### Analytics Platform (Port 5000)")
-st.sidebar.markdown("""
-- [Analytics Home](/)
-- [Data Sources](/Data_Sources)
-- [Dashboard Builder](/Dashboard_Builder)
-- [Reports](/Reports)
-- [Data Transformation](/Data_Transformation)
-- [API Documentation](/API_Documentation)
-""")
+<div class="two-column">
+<div class="column">
+
+### Luxury Vehicles
+{_bullets(_LUX)}
 
-# Car Service App Navigation
-st.sidebar.markdown("### Car Service App (Port 8080)")
-st.sidebar.markdown("""
-<div id="sidebarLinks">
-- <a href="#" id="homeLink">Car App Home</a>
-- <a href="#" id="chatbotLink">Diagnostic Chatbot</a>
-- <a href="#" id="centersLink">Maintenance Centers</a>
-- <a href="#" id="mapLink">Interactive Map</a>
-- <a href="#" id="settingsLink">User Settings</a>
 </div>
+<div class="column">
 
-<script>
-document.addEventListener('DOMContentLoaded', function() {
-    // Get the host without the port
-    const hostParts = window.location.host.split(':');
-    const hostname = hostParts[0];
-    
-    // Update sidebar links
-    document.getElementById('homeLink').href = 'http://' + hostname + ':8080';
-    document.getElementById('chatbotLink').href = 'http://' + hostname + ':8080/chatbot';
-    document.getElementById('centersLink').href = 'http://' + hostname + ':8080/maintenance-centers';
-    document.getElementById('mapLink').href = 'http://' + hostname + ':8080/map';
-    document.getElementById('settingsLink').href = 'http://' + hostname + ':8080/settings';
-    
-    // Update the other links we added earlier
-    if(document.getElementById('chatbotUrl')) {
-        document.getElementById('chatbotUrl').href = 'http://' + hostname + ':8080/chatbot';
-    }
-    if(document.getElementById('healthUrl')) {
-        document.getElementById('healthUrl').href = 'http://' + hostname + ':8080/vehicle-health';
-    }
-});
-</script>
+### Common Vehicles
+{_bullets(_COMMON)}
+
+</div>
+</div>
 """, unsafe_allow_html=True)
 
-# About section
-st.sidebar.markdown("---")
-st.sidebar.header("About the Platform")
-st.sidebar.info("""
-This dual-platform system combines a powerful data analytics dashboard with a user-friendly mobile car diagnostic application.
+    # Mobile optimization
+    st.markdown("## Mobile-First Design Philosophy\n" + _static_block("mobile.html"), unsafe_allow_html=True)
 
-The analytics dashboard (port 5000) enables creating custom reports and visualizations, while the car service app (port 8080) provides AI-powered diagnostic solutions and maintenance services.
+    # Platform Screenshots
+    st.markdown("## Platform Screenshots\n" + _static_block("screenshots.html"), unsafe_allow_html=True)
 
-Both applications operate independently but can share data for integrated operations.
-""")
\ No newline at end of file
+    # Display rich information about our applications
+    st.markdown(_app_details_html(host), unsafe_allow_html=True)
+
+
+@st.fragment
+def sidebar():
+    st.markdown(_sidebar_html(_car_app_host()), unsafe_allow_html=True)
+
+
+def main():
+    # Configure page
+    st.set_page_config(
+        page_title="Car Service & Analytics Platform",
+        page_icon="🚗",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    landing()
+
+    with st.sidebar:
+        sidebar()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,120 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
 from flask_cors import CORS
+from flask_caching import Cache
+from cachetools import TTLCache
+from flask.json.provider import DefaultJSONProvider
 import os
 import json
 import re
 import secrets
-from geopy.distance import geodesic
+import hashlib
+import logging
+import numpy as np
+import orjson
+from sqlalchemy import event, func
 from datetime import datetime, timedelta
 import random
+import heapq
+from collections import Counter
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 # Import database modules
-from database import init_db
+from database import init_db, remove_session
 import db_utils
+from utils.nearest import build_location_index, nearest_location
+from utils.gemini_helper import generate_diagnostic_response, generate_maintenance_tips, generate_related_issues
+from utils.ai_insights import analyze_fleet_threaded, get_complete_vehicle_analysis
+
+# Configure logging
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster jsonify() responses."""
+    
+    # Keys keep their insertion order; sorting them cost a pass over every dict in the response
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    @staticmethod
+    def default(o):
+        # Let handlers return model instances directly
+        if hasattr(o, "to_dict"):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 # Initialize Flask app
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)  # Secure session key
+app.json = ORJSONProvider(app)
+# Serve "/path/" and "/path" alike instead of answering one with a redirect
+app.url_map.strict_slashes = False
+# Stable session key shared by all workers; a random one only suits local development
+app.secret_key = os.environ.get('FLASK_SECRET_KEY')
+if not app.secret_key:
+    logger.warning("FLASK_SECRET_KEY not set. Using a random key; sessions won't survive restarts.")
+    app.secret_key = secrets.token_hex(16)
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
 CORS(app)
 
+# Response cache for near-static endpoints (Redis when REDIS_URL is set, in-process otherwise)
+if os.environ.get('REDIS_URL'):
+    cache = Cache(app, config={
+        'CACHE_TYPE': 'RedisCache',
+        'CACHE_REDIS_URL': os.environ['REDIS_URL'],
+        'CACHE_DEFAULT_TIMEOUT': 300
+    })
+else:
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 300})
+
+def is_cacheable(response):
+    """Only cache successful responses, never error tuples."""
+    return getattr(response, 'status_code', None) == 200
+
+def stream_json_list(objects):
+    """Stream objects' to_dict() as a JSON array without building the whole list."""
+    objects = iter(objects)
+    # Pull the first row now so query errors still surface as a normal error response
+    first = next(objects, None)
+    
+    def generate():
+        if first is None:
+            yield b"[]"
+            return
+        yield b"[" + orjson.dumps(first.to_dict(), default=app.json.default, option=app.json.option)
+        for obj in objects:
+            yield b"," + orjson.dumps(obj.to_dict(), default=app.json.default, option=app.json.option)
+        yield b"]"
+    
+    return Response(stream_with_context(generate()), mimetype="application/json", direct_passthrough=True)
+
 # Initialize database
 init_db()
 
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """Release the request's database session."""
+    remove_session()
+
+# Background pool for the independent LLM calls made by /search
+llm_executor = ThreadPoolExecutor(max_workers=8)
+
+# Seconds to wait for the supplementary LLM calls before answering without them
+LLM_EXTRA_TIMEOUT = 5
+
 # Sample car issue data for the chatbot
 car_issues = [
     {
@@ -61,33 +154,6 @@ car_issues = [
     }
 ]
 
-# Sample maintenance center data
-maintenance_centers = [
-    {"id": 1, "name": "AutoFix Center", "latitude": 30.0444, "longitude": 31.2357},
-    {"id": 2, "name": "Pro Mechanics", "latitude": 30.0500, "longitude": 31.2300},
-    {"id": 3, "name": "Expert Car Services", "latitude": 30.0550, "longitude": 31.2400}
-]
-
-# Sample car owner data (for towing service)
-car_owners = [
-    {"id": 1, "name": "Ahmed", "personal_number": "01112218026", "latitude": 30.0480, "longitude": 31.2370},
-    {"id": 2, "name": "Mohamed", "personal_number": "01012345678", "latitude": 30.0520, "longitude": 31.2410}
-]
-
-# This will be replaced with database queries
-# Legacy user array for backward compatibility until fully migrated
-users = [
-    {
-        "id": 1,
-        "email": "user@example.com",
-        "name": "Test User",
-        "password": "argon2$Password123!",  # This is a dummy hash; we'll use db authentication
-        "car_brand": "Toyota",
-        "car_model": "Corolla",
-        "manufacturing_year": 2020
-    }
-]
-
 # ROUTES
 
 @app.route('/')
@@ -133,18 +199,14 @@ def get_user_vehicles():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
             
-        # Get vehicles from database
-        vehicles = db_utils.get_user_vehicles(user_id)
-        
-        # Convert to JSON-serializable format
-        vehicle_list = [vehicle.to_dict() for vehicle in vehicles]
-        
-        return jsonify(vehicle_list)
+        # Stream vehicles from database
+        return stream_json_list(db_utils.iter_user_vehicles(user_id))
     except Exception as e:
-        print(f"Error fetching user vehicles: {str(e)}")
+        logger.error("Error fetching user vehicles: %s", e)
         return jsonify({"error": "Failed to fetch vehicles"}), 500
 
 @app.route('/api/maintenance-centers', methods=['GET'])
+@cache.cached(query_string=True, response_filter=is_cacheable)
 def get_maintenance_centers():
     try:
         # Get centers from database
@@ -155,34 +217,62 @@ def get_maintenance_centers():
         
         return jsonify(center_list)
     except Exception as e:
-        print(f"Error fetching maintenance centers: {str(e)}")
+        logger.error("Error fetching maintenance centers: %s", e)
         return jsonify({"error": "Failed to fetch maintenance centers"}), 500
         
 @app.route('/api/maintenance-center/<int:center_id>', methods=['GET'])
+@cache.cached(query_string=True, response_filter=is_cacheable)
 def get_maintenance_center(center_id):
     """Get details for a specific maintenance center."""
     try:
-        # Get center from database
-        center = db_utils.get_center_by_id(center_id)
+        # Get center and its services from database
+        center = db_utils.get_center_with_services(center_id)
         
         if not center:
             return jsonify({"error": "Maintenance center not found"}), 404
             
-        # Get services for this center
-        services = db_utils.get_center_services(center_id)
-        
         # Convert to JSON-serializable format
-        center_data = center.to_dict()
-        service_list = [service.to_dict() for service in services]
+        service_list = [service.to_dict() for service in center.services]
         
-        # Add services to center data
-        center_data['services'] = service_list
+        # Add services to a copy of the (memoized) center data
+        center_data = {**center.to_dict(), 'services': service_list}
         
         return jsonify(center_data)
     except Exception as e:
-        print(f"Error fetching maintenance center: {str(e)}")
+        logger.error("Error fetching maintenance center: %s", e)
         return jsonify({"error": "Failed to fetch maintenance center details"}), 500
 
+# How long a user's profile data stays cached (seconds)
+USER_CACHE_TIMEOUT = 300
+
+def get_cached_user_data(user_id):
+    """Return a user's to_dict() through the shared cache, or None if there is no such user."""
+    cache_key = f"user:{user_id}"
+    try:
+        user_data = cache.get(cache_key)
+        if user_data is not None:
+            return user_data
+    except Exception as cache_error:
+        logger.warning("User cache unavailable: %s", cache_error)
+    
+    user = db_utils.get_user_by_id(user_id)
+    if not user:
+        return None
+    
+    user_data = user.to_dict()
+    try:
+        cache.set(cache_key, user_data, timeout=USER_CACHE_TIMEOUT)
+    except Exception as cache_error:
+        logger.warning("User cache unavailable: %s", cache_error)
+    return user_data
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached profile data after it changes."""
+    try:
+        cache.delete(f"user:{user_id}")
+    except Exception as cache_error:
+        logger.warning("User cache unavailable: %s", cache_error)
+
 @app.route('/api/user/profile', methods=['GET'])
 def get_user_profile():
     """Get user profile information."""
@@ -192,10 +282,10 @@ def get_user_profile():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
             
-        # Get user profile from database
-        user = db_utils.get_user_by_id(user_id)
+        # Get user profile from cache or database
+        user_data = get_cached_user_data(user_id)
         
-        if not user:
+        if not user_data:
             return jsonify({"error": "User not found"}), 404
             
         # Get user's vehicles
@@ -203,12 +293,11 @@ def get_user_profile():
         vehicle_list = [vehicle.to_dict() for vehicle in vehicles]
         
         # Convert to JSON-serializable format and include vehicles
-        user_data = user.to_dict()
-        user_data['vehicles'] = vehicle_list
+        user_data = {**user_data, 'vehicles': vehicle_list}
         
         return jsonify(user_data)
     except Exception as e:
-        print(f"Error fetching user profile: {str(e)}")
+        logger.error("Error fetching user profile: %s", e)
         return jsonify({"error": "Failed to fetch user profile"}), 500
         
 @app.route('/api/user/profile', methods=['PUT'])
@@ -238,6 +327,10 @@ def update_user_profile():
         
         if error:
             return jsonify({"error": error}), 400
+        
+        # Cached profile and nearest-owner results include the changed fields
+        invalidate_cached_user(user.id)
+        invalidate_owner_index()
             
         return jsonify({
             "success": True,
@@ -246,85 +339,115 @@ def update_user_profile():
         })
         
     except Exception as e:
-        print(f"Error updating user profile: {str(e)}")
+        logger.error("Error updating user profile: %s", e)
         return jsonify({"error": "Failed to update user profile"}), 500
 
+# Seconds before the owner location index is rebuilt from the database
+OWNER_INDEX_TTL = 300
+
+# Snapshot of owner locations: (built_at, owners, lats, lons, tree)
+_owner_index = None
+
+def load_owner_index():
+    """Load each active user's preferred location and index them for nearest lookups."""
+    with db_utils.session_scope() as session:
+        # Rank each user's locations (favorite first, then oldest) and keep the top one
+        rn = func.row_number().over(
+            partition_by=db_utils.SavedLocation.user_id,
+            order_by=(db_utils.SavedLocation.is_favorite.desc().nulls_last(), db_utils.SavedLocation.id)
+        ).label("rn")
+        ranked = session.query(db_utils.SavedLocation.id.label("location_id"), rn).subquery()
+
+        owners = session.query(
+                db_utils.User.name,
+                db_utils.User.phone,
+                db_utils.SavedLocation.latitude,
+                db_utils.SavedLocation.longitude
+            )\
+            .join(db_utils.SavedLocation, db_utils.SavedLocation.user_id == db_utils.User.id)\
+            .join(ranked, ranked.c.location_id == db_utils.SavedLocation.id)\
+            .filter(db_utils.User.is_active == True, ranked.c.rn == 1)\
+            .all()
+
+    lats = np.fromiter((owner.latitude for owner in owners), dtype=np.float64, count=len(owners))
+    lons = np.fromiter((owner.longitude for owner in owners), dtype=np.float64, count=len(owners))
+    return time.monotonic(), owners, lats, lons, build_location_index(lats, lons)
+
+def get_owner_index():
+    """Return the cached owner location index, rebuilding it once it is stale."""
+    global _owner_index
+    if _owner_index is None or time.monotonic() - _owner_index[0] > OWNER_INDEX_TTL:
+        _owner_index = load_owner_index()
+    return _owner_index
+
+def invalidate_owner_index():
+    """Force the next nearest-owner lookup to reload locations."""
+    global _owner_index
+    _owner_index = None
+
+def parse_lat_lon(args):
+    """Parse lat/lon query arguments, returning (lat, lon) in degrees or None if invalid."""
+    try:
+        lat = float(args["lat"])
+        lon = float(args["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Range checks also reject NaN and infinity
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
 @app.route('/nearest-owner', methods=['GET'])
 def get_nearest_owner():
     try:
-        user_lat = float(request.args.get("lat"))
-        user_lon = float(request.args.get("lon"))
+        coords = parse_lat_lon(request.args)
+        if coords is None:
+            return jsonify({"error": "Valid lat (-90 to 90) and lon (-180 to 180) are required"}), 400
+        user_lat, user_lon = coords
 
-        # Get all users from database
-        session = db_utils.get_session()
-        try:
-            users = session.query(db_utils.User).filter(db_utils.User.is_active == True).all()
-            
-            if not users:
-                return jsonify({"message": "No active users found."}), 404
-                
-            # Find users with saved locations
-            users_with_locations = []
-            for user in users:
-                # Get user's saved locations
-                locations = db_utils.get_user_saved_locations(user.id)
-                if locations:
-                    # Use the first location (or favorite if available)
-                    favorite_location = next((loc for loc in locations if loc.is_favorite), locations[0])
-                    users_with_locations.append({
-                        "user": user,
-                        "location": favorite_location
-                    })
-            
-            if not users_with_locations:
-                return jsonify({"message": "No users with saved locations found."}), 404
-                
-            # Find the nearest user using Haversine formula
-            nearest_owner = None
-            min_distance = float('inf')
-            
-            for user_data in users_with_locations:
-                user = user_data["user"]
-                location = user_data["location"]
-                
-                owner_location = (location.latitude, location.longitude)
-                user_location = (user_lat, user_lon)
-                distance = geodesic(user_location, owner_location).km
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_owner = {
-                        "user": user,
-                        "location": location,
-                        "distance": distance
-                    }
-            
-            if nearest_owner:
-                return jsonify({
-                    "name": nearest_owner["user"].name,
-                    "phone": nearest_owner["user"].phone or "Not available",
-                    "latitude": nearest_owner["location"].latitude,
-                    "longitude": nearest_owner["location"].longitude,
-                    "distance_km": round(nearest_owner["distance"], 2)
-                })
-            else:
-                return jsonify({"message": "No nearby owners found."}), 404
-                
-        finally:
-            session.close()
+        # Get active users with their saved locations from the cached index
+        _, owners, lats, lons, tree = get_owner_index()
+
+        if not owners:
+            return jsonify({"message": "No users with saved locations found."}), 404
+
+        # Find the nearest user using the Haversine distance
+        idx, distance = nearest_location(tree, user_lat, user_lon, lats, lons)
+        owner = owners[idx]
+
+        return jsonify({
+            "name": owner.name,
+            "phone": owner.phone or "Not available",
+            "latitude": owner.latitude,
+            "longitude": owner.longitude,
+            "distance_km": round(distance, 2)
+        })
             
     except Exception as e:
-        print(f"Error finding nearest owner: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error finding nearest owner: %s", e)
+        return jsonify({"error": "Failed to find nearest owner"}), 500
+
+# Fields each JSON endpoint must receive (non-empty)
+SIGNUP_REQUIRED_FIELDS = ("email", "name", "password", "car_brand", "car_model", "manufacturing_year")
+SIGNIN_REQUIRED_FIELDS = ("email", "password")
+APPOINTMENT_REQUIRED_FIELDS = ("user_id", "vehicle_id", "center_id", "appointment_date")
+
+def missing_fields(data, fields):
+    """Return the names of required fields that are absent or empty in data."""
+    return [field for field in fields if not data.get(field)]
+
+# Password strength patterns
+_DIGIT_RE = re.compile(r"\d")
+_SPECIAL_RE = re.compile(r"[!@#$%^&*]")
 
 # Strong password validation
 def is_strong_password(password):
     """Check if the password meets strength requirements."""
     if len(password) < 8:
         return "Password must be at least 8 characters long."
-    if not re.search(r"\d", password):  # Check for a number
+    if not _DIGIT_RE.search(password):  # Check for a number
         return "Password must contain at least one number."
-    if not re.search(r"[!@#$%^&*]", password):  # Check for a special character
+    if not _SPECIAL_RE.search(password):  # Check for a special character
         return "Password must contain at least one special character (!@#$%^&*)."
     return None  # Password is valid
 
@@ -332,15 +455,16 @@ def is_strong_password(password):
 def signup():
     try:
         data = request.json
-        email = data.get("email")
-        name = data.get("name")
-        password = data.get("password")
-        car_brand = data.get("car_brand")
-        car_model = data.get("car_model")
-        manufacturing_year = data.get("manufacturing_year")
-
-        if not email or not name or not password or not car_brand or not car_model or not manufacturing_year:
-            return jsonify({"error": "All fields are required"}), 400
+        missing = missing_fields(data, SIGNUP_REQUIRED_FIELDS)
+        if missing:
+            return jsonify({"error": "All fields are required", "missing": missing}), 400
+        
+        email = data["email"]
+        name = data["name"]
+        password = data["password"]
+        car_brand = data["car_brand"]
+        car_model = data["car_model"]
+        manufacturing_year = data["manufacturing_year"]
         
         # Check if strong password or not 
         password_error = is_strong_password(password)
@@ -382,11 +506,12 @@ def signup():
 def signin():
     try:
         data = request.json
-        email = data.get("email")
-        password = data.get("password")
-
-        if not email or not password:
-            return jsonify({"error": "Email and password are required"}), 400
+        missing = missing_fields(data, SIGNIN_REQUIRED_FIELDS)
+        if missing:
+            return jsonify({"error": "Email and password are required", "missing": missing}), 400
+        
+        email = data["email"]
+        password = data["password"]
 
         # Authenticate user with database
         user, error = db_utils.authenticate_user(email, password)
@@ -395,6 +520,9 @@ def signin():
             return jsonify({"error": "Invalid email or password"}), 401
             
         if user:
+            # Sign-in updated last_login
+            invalidate_cached_user(user.id)
+            
             # Set up session data
             session['user_id'] = user.id
             session['name'] = user.name
@@ -409,9 +537,24 @@ def signin():
             return jsonify({"error": "Invalid email or password"}), 401
         
     except Exception as e:
-        print("Error in /signin:", str(e))
+        logger.error("Error in /signin: %s", e)
         return jsonify({"error": str(e)}), 500
 
+# car_issues normalized once into parallel arrays indexed by issue id
+ISSUE_RECORDS = tuple((issue["problem_en"], issue["solution_en"]) for issue in car_issues)
+ISSUE_BRANDS_LC = tuple(issue["brand"].lower() for issue in car_issues)
+ISSUE_MODELS_LC = tuple(issue["model"].lower() for issue in car_issues)
+ISSUE_KEYWORDS_SETS = tuple(frozenset(issue["keywords"].lower().split(", ")) for issue in car_issues)
+
+# Most keyword-search results returned by /search
+MAX_FALLBACK_RESULTS = 5
+
+# Inverted index: keyword -> ids of the issues that list it
+KEYWORD_TO_ISSUE_IDS = {}
+for issue_id, issue_keywords in enumerate(ISSUE_KEYWORDS_SETS):
+    for keyword in issue_keywords:
+        KEYWORD_TO_ISSUE_IDS.setdefault(keyword, []).append(issue_id)
+
 # General car issue suggestions
 general_issues = {
     "car not starting": "Is the issue related to the battery, starter motor, or ignition?",
@@ -426,24 +569,52 @@ general_issues = {
     "مشكلة في مكيف الهواء": "هل ينفث مكيف الهواء هواءً ساخنًا، أو يصدر ضوضاء، أو لا يعمل؟"
 }
 
+# Common English filler words that never identify a car problem
+_STOPWORDS = frozenset({
+    "the", "and", "for", "with", "from", "this", "that", "these", "those", "there",
+    "when", "what", "which", "while", "then", "than", "are", "was", "were", "been",
+    "has", "have", "had", "its", "our", "you", "your", "can", "could", "would",
+    "should", "will", "just", "very", "also", "into", "about", "after", "some", "any"
+})
+
+# Arabic diacritics (tanween, harakat, shadda, sukun, superscript alef) and tatweel, removed before matching
+_AR_DIACRITICS = dict.fromkeys([*range(0x064B, 0x0653), 0x0670, 0x0640])
+
 # Simplified keyword extraction without requiring spaCy
 def extract_keywords(text):
-    """Extract potential keywords from text using simple splitting and filtering."""
-    # Convert to lowercase and split by whitespace
-    words = text.lower().split()
+    """Extract the set of potential keywords from text in a single pass."""
+    # Convert to lowercase, drop Arabic diacritics and split by whitespace
+    words = text.lower().translate(_AR_DIACRITICS).split()
     
-    # Filter out very short words (likely prepositions, articles, etc.)
-    keywords = [word for word in words if len(word) > 2]
+    # Filter out very short words and stopwords (prepositions, articles, etc.)
+    keywords = {word for word in words if len(word) > 2 and word not in _STOPWORDS}
     
-    # If no keywords found, fall back to original text split
-    return keywords if keywords else text.lower().split()
+    # If no keywords found, fall back to all words
+    return keywords or set(words)
+
+# Lowercased general_issues keys for the follow-up check in /search
+GENERAL_ISSUES_LC = tuple((key.lower(), question) for key, question in general_issues.items())
+
+# Arabic characters (Unicode range U+0600 to U+06FF)
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
 
 # Language detection and translation simulation
+def is_arabic_text(text):
+    """Return True if text contains any Arabic characters."""
+    return _ARABIC_RE.search(text) is not None
+
 def detect_language(text):
     """Detect if text is Arabic or English."""
-    # Check if text contains Arabic characters (Unicode range U+0600 to U+06FF)
-    is_arabic = any("\u0600" <= char <= "\u06FF" for char in text)
-    return "ar" if is_arabic else "en"
+    return "ar" if is_arabic_text(text) else "en"
+
+# How long an AI diagnosis stays cached (seconds)
+AI_RESPONSE_CACHE_TIMEOUT = 86400
+
+def ai_response_cache_key(query_text, brand, model):
+    """Cache key for an AI diagnosis, insensitive to word order and case."""
+    normalized = " ".join(sorted(extract_keywords(query_text)))
+    digest = hashlib.sha1(f"{normalized}|{brand.lower()}|{model.lower()}".encode("utf-8")).hexdigest()
+    return f"ai_response:{digest}"
 
 def simulate_translation(text, target_lang="en"):
     """Simulate translation by checking if text appears to be in Arabic."""
@@ -466,12 +637,6 @@ def simulate_translation(text, target_lang="en"):
 @app.route("/search", methods=["POST"])
 def search():
     try:
-        import logging
-        from utils.gemini_helper import generate_diagnostic_response, generate_maintenance_tips, generate_related_issues
-        
-        # Set up logging for diagnostics
-        logging.basicConfig(level=logging.INFO)
-        logger = logging.getLogger(__name__)
         logger.info("Starting diagnostic search")
         
         # Parse request data
@@ -485,7 +650,7 @@ def search():
         model = data.get("model", "").strip()
         
         # Log the request parameters
-        logger.info(f"Search request - Query: '{query_text}', Brand: '{brand}', Model: '{model}'")
+        logger.info("Search request - Query: '%s', Brand: '%s', Model: '%s'", query_text, brand, model)
         
         # Create case-insensitive filters
         brand_filter = brand.lower() if brand else None
@@ -496,8 +661,9 @@ def search():
             return jsonify({"error": "Please provide a description of your car problem."}), 400
             
         # Check for follow-up questions that might be needed for vague queries
-        for key, question in general_issues.items():
-            if key.lower() in query_text.lower() and len(query_text.split()) < 5:
+        query_lc = query_text.lower()
+        for key, question in GENERAL_ISSUES_LC:
+            if key in query_lc and len(query_text.split()) < 5:
                 response = {
                     "message": "I need more details to provide a solution, احتاج المزيد من التفاصيل لمساعدك.",
                     "follow_up_question": question
@@ -505,17 +671,27 @@ def search():
                 return jsonify(response)
 
         # Language detection for Arabic
-        is_arabic = any("\u0600" <= char <= "\u06FF" for char in query_text)
+        is_arabic = is_arabic_text(query_text)
         
         # For Arabic queries, perform simple translation
         if is_arabic:
             # Inform that we detected Arabic
-            print("Arabic query detected: translation would be applied")
+            logger.debug("Arabic query detected: translation would be applied")
             # In a production system, we would use a proper translation API here
         
+        # Serve a previously generated AI diagnosis for the same question
+        cache_key = ai_response_cache_key(query_text, brand, model)
+        try:
+            cached_response = cache.get(cache_key)
+        except Exception as cache_error:
+            logger.warning("AI response cache unavailable: %s", cache_error)
+            cached_response = None
+        if cached_response:
+            return jsonify(cached_response)
+        
         # Use OpenAI to generate a diagnostic response
         try:
-            print(f"Generating diagnostic for {brand} {model}: {query_text}")
+            logger.debug("Generating diagnostic for %s %s: %s", brand, model, query_text)
             
             # Call OpenAI for detailed diagnostics
             ai_response = generate_diagnostic_response(query_text, brand, model)
@@ -525,66 +701,70 @@ def search():
                 # Process the results
                 results = ai_response['results']
                 
-                # Add related issues for the first problem
+                # Fetch maintenance tips and related issues for the first problem concurrently
+                tips_future = llm_executor.submit(generate_maintenance_tips, brand, model)
+                related_future = None
                 if len(results) > 0 and 'problem' in results[0]:
-                    related = generate_related_issues(brand, model, results[0]['problem'])
-                    if related:
-                        ai_response['related_issues'] = related
+                    related_future = llm_executor.submit(generate_related_issues, brand, model, results[0]['problem'])
                 
-                # Generate maintenance tips
-                maintenance_tips = generate_maintenance_tips(brand, model)
-                if maintenance_tips:
-                    ai_response['maintenance_tips'] = maintenance_tips
+                # Add related issues and maintenance tips, skipping any that time out
+                for key, future in (('related_issues', related_future), ('maintenance_tips', tips_future)):
+                    if future is None:
+                        continue
+                    try:
+                        value = future.result(timeout=LLM_EXTRA_TIMEOUT)
+                    except FutureTimeoutError:
+                        logger.warning("Timed out waiting for %s", key)
+                        continue
+                    if value:
+                        ai_response[key] = value
                 
-                # Return enhanced AI response
+                # Cache and return enhanced AI response
+                try:
+                    cache.set(cache_key, ai_response, timeout=AI_RESPONSE_CACHE_TIMEOUT)
+                except Exception as cache_error:
+                    logger.warning("AI response cache unavailable: %s", cache_error)
                 return jsonify(ai_response)
             
             # Fallback to traditional search if AI response has no results
-            print("No AI results, falling back to traditional search")
+            logger.debug("No AI results, falling back to traditional search")
         except Exception as ai_error:
             # Log the AI error but continue with traditional search
-            print(f"Error with AI diagnostic: {str(ai_error)}")
+            logger.error("Error with AI diagnostic: %s", ai_error)
         
         # Traditional keyword-based search (fallback method)
         # Extract keywords from query
-        extracted_keywords = extract_keywords(query_text)
-        refined_query = " ".join(extracted_keywords)
-
-        # Search for relevant problems
+        query_keywords = extract_keywords(query_text)
+        
+        # Score only issues that share a keyword with the query: one point per shared keyword
+        scores = Counter()
+        for keyword in query_keywords:
+            scores.update(KEYWORD_TO_ISSUE_IDS.get(keyword, ()))
+        
+        # Apply brand & model filtering
+        matches = [
+            (issue_id, match_score) for issue_id, match_score in scores.items()
+            if (not brand_filter or brand_filter == ISSUE_BRANDS_LC[issue_id])
+            and (not model_filter or model_filter == ISSUE_MODELS_LC[issue_id])
+        ]
+        
+        # Keep the most relevant issues, earlier issues first on ties
         results = []
-        for issue in car_issues:
-            # Apply brand & model filtering
-            if brand_filter and brand_filter != issue["brand"].lower():
-                continue
-            if model_filter and model_filter != issue["model"].lower():
-                continue
-                
-            # Check for keyword matches
-            issue_keywords = set(issue["keywords"].lower().split(", "))
-            query_keywords = set(refined_query.lower().split())
-            
-            match_score = len(query_keywords.intersection(issue_keywords))
+        for issue_id, match_score in heapq.nlargest(MAX_FALLBACK_RESULTS, matches, key=lambda m: (m[1], -m[0])):
+            problem, solution = ISSUE_RECORDS[issue_id]
+            # Simulate translating response back to Arabic if needed
+            if is_arabic:
+                problem = simulate_translation(problem, "ar")
+                solution = simulate_translation(solution, "ar")
             
-            if match_score > 0:
-                problem = issue["problem_en"]
-                solution = issue["solution_en"]
-                
-                # Simulate translating response back to Arabic if needed
-                if is_arabic:
-                    problem = simulate_translation(problem, "ar")
-                    solution = simulate_translation(solution, "ar")
-                
-                results.append({
-                    "problem": problem,
-                    "solution": solution,
-                    "score": match_score,
-                    "problem_severity": "Warning",  # Default severity for backward compatibility
-                    "estimated_cost": "$100-300",   # Default cost estimate
-                    "diy_possible": True,          # Default DIY possibility
-                })
-        
-        # Sort results by relevance
-        results.sort(key=lambda x: x.get("score", 0), reverse=True)
+            results.append({
+                "problem": problem,
+                "solution": solution,
+                "score": match_score,
+                "problem_severity": "Warning",  # Default severity for backward compatibility
+                "estimated_cost": "$100-300",   # Default cost estimate
+                "diy_possible": True,          # Default DIY possibility
+            })
         
         if not results:
             # Try to generate a response even when we don't have exact matches
@@ -608,7 +788,7 @@ def search():
         return jsonify({"results": results})
         
     except Exception as e:
-        print("Error in /search:", str(e))
+        logger.error("Error in /search: %s", e)
         return jsonify({"error": "An unexpected error occurred. Our technical team has been notified. Please try again."}), 500
 
 @app.route("/get-directions", methods=["GET"])
@@ -659,8 +839,9 @@ def book_appointment():
         notes = data.get("notes")
         
         # Validate required inputs
-        if not user_id or not vehicle_id or not center_id or not appointment_date_str:
-            return jsonify({"error": "User ID, vehicle ID, center ID and appointment date are required"}), 400
+        missing = missing_fields(data, APPOINTMENT_REQUIRED_FIELDS)
+        if missing:
+            return jsonify({"error": "User ID, vehicle ID, center ID and appointment date are required", "missing": missing}), 400
             
         # Parse appointment date
         try:
@@ -688,7 +869,7 @@ def book_appointment():
         })
         
     except Exception as e:
-        print(f"Error booking appointment: {str(e)}")
+        logger.error("Error booking appointment: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/user/appointments", methods=["GET"])
@@ -701,15 +882,10 @@ def get_user_appointments():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
             
-        # Get appointments from database
-        appointments = db_utils.get_user_appointments(user_id, status)
-        
-        # Convert to JSON-serializable format
-        appointment_list = [appointment.to_dict() for appointment in appointments]
-        
-        return jsonify(appointment_list)
+        # Stream appointments from database
+        return stream_json_list(db_utils.iter_user_appointments(user_id, status))
     except Exception as e:
-        print(f"Error fetching user appointments: {str(e)}")
+        logger.error("Error fetching user appointments: %s", e)
         return jsonify({"error": "Failed to fetch appointments"}), 500
 
 @app.route("/save-location", methods=["POST"])
@@ -741,6 +917,9 @@ def save_location():
         
         if error:
             return jsonify({"error": error}), 400
+        
+        # The new location may change who the nearest owner is
+        invalidate_owner_index()
             
         return jsonify({
             "success": True,
@@ -749,9 +928,164 @@ def save_location():
         })
         
     except Exception as e:
-        print(f"Error saving location: {str(e)}")
+        logger.error("Error saving location: %s", e)
         return jsonify({"error": str(e)}), 500
 
+# How long a vehicle health analysis stays cached (seconds)
+VEHICLE_ANALYSIS_CACHE_TIMEOUT = 600
+
+# Per-process L1 in front of the shared cache for the hottest vehicles; its shorter TTL
+# keeps it from ever serving anything older than the shared cache would
+vehicle_analysis_l1 = TTLCache(maxsize=512, ttl=60)
+vehicle_analysis_l1_lock = threading.RLock()
+
+def vehicle_analysis_cache_key(vehicle_id, brand, model, year, condition):
+    """
+    Cache key for a vehicle analysis, scoped to the vehicle's current data generation.
+    
+    The same key is used for the L1, so a generation bump from any worker retires this
+    worker's L1 entries too. Returns None if the shared cache is unavailable.
+    """
+    try:
+        generation = cache.get(f"vh_gen:{vehicle_id}") or 0
+    except Exception as cache_error:
+        logger.warning("Vehicle analysis cache unavailable: %s", cache_error)
+        return None
+    condition_digest = hashlib.blake2b(condition.encode("utf-8"), digest_size=8).hexdigest()
+    return f"vh:{vehicle_id}:{generation}:{brand}:{model}:{year}:{condition_digest}"
+
+def lookup_vehicle_analysis(cache_key):
+    """Return a cached get_complete_vehicle_analysis() from the L1 or shared cache, or None."""
+    if cache_key is None:
+        return None
+    with vehicle_analysis_l1_lock:
+        analysis = vehicle_analysis_l1.get(cache_key)
+    if analysis is not None:
+        return analysis
+    
+    try:
+        analysis = cache.get(cache_key)
+    except Exception as cache_error:
+        logger.warning("Vehicle analysis cache unavailable: %s", cache_error)
+        return None
+    if analysis is not None:
+        with vehicle_analysis_l1_lock:
+            vehicle_analysis_l1[cache_key] = analysis
+    return analysis
+
+def store_vehicle_analysis(cache_key, analysis):
+    """Put a freshly built analysis in the shared cache and the L1."""
+    if cache_key is None:
+        return
+    try:
+        cache.set(cache_key, analysis, timeout=VEHICLE_ANALYSIS_CACHE_TIMEOUT)
+    except Exception as cache_error:
+        logger.warning("Vehicle analysis cache unavailable: %s", cache_error)
+    with vehicle_analysis_l1_lock:
+        vehicle_analysis_l1[cache_key] = analysis
+
+def get_cached_vehicle_analysis(vehicle_id, brand, model, year, condition):
+    """Return get_complete_vehicle_analysis() through the L1 and shared caches, falling back to a live call."""
+    # Key on the generation read before the analysis is built, so data inserted meanwhile
+    # retires it instead of being masked by it
+    cache_key = vehicle_analysis_cache_key(vehicle_id, brand, model, year, condition)
+    analysis = lookup_vehicle_analysis(cache_key)
+    if analysis is None:
+        analysis = get_complete_vehicle_analysis(vehicle_id, brand, model, year, condition)
+        store_vehicle_analysis(cache_key, analysis)
+    return analysis
+
+@event.listens_for(db_utils.VehicleHealthData, "after_insert")
+def invalidate_vehicle_analysis(mapper, connection, target):
+    """Retire cached analyses for a vehicle as soon as it reports new health data."""
+    # Other workers' L1 entries are retired by the generation bump; drop ours right away
+    key_prefix = f"vh:{target.vehicle_id}:"
+    with vehicle_analysis_l1_lock:
+        for key in [key for key in vehicle_analysis_l1 if key.startswith(key_prefix)]:
+            vehicle_analysis_l1.pop(key, None)
+    
+    try:
+        # inc() is an atomic INCR on Redis, so concurrent inserts from other workers can't
+        # lose a bump; a missing key starts from 0, the generation the cache key reads it as
+        cache.cache.inc(f"vh_gen:{target.vehicle_id}")
+    except Exception as cache_error:
+        logger.warning("Vehicle analysis cache unavailable: %s", cache_error)
+
+# (health field, trigger, condition label) used to describe a vehicle's latest readings
+HEALTH_CONDITION_RULES = (
+    ("check_engine_light", bool, "check engine light on"),
+    ("oil_level", lambda v: bool(v) and v < 30, "low oil level"),
+    ("coolant_level", lambda v: bool(v) and v < 30, "low coolant level"),
+    ("engine_temperature", lambda v: bool(v) and v > 100, "high engine temperature"),
+)
+
+def vehicle_analysis_args(vehicle_id, vehicle):
+    """(brand, model, year, condition) to analyze for a vehicle health row."""
+    # Use vehicle data for analysis
+    brand = vehicle.brand
+    model = vehicle.model
+    year = str(vehicle.year)
+    
+    # If we have health data, use it to enhance the analysis
+    condition = ""
+    if vehicle.health_timestamp is not None:
+        # Build condition string based on health data
+        condition = ", ".join(
+            label for field, is_triggered, label in HEALTH_CONDITION_RULES
+            if is_triggered(getattr(vehicle, field))
+        )
+    
+    # Log the request parameters
+    logger.info("Vehicle health request - ID: '%s', Brand: '%s', Model: '%s', Year: '%s'", vehicle_id, brand, model, year)
+    return brand, model, year, condition
+
+def build_vehicle_health_analysis(vehicle_id, vehicle):
+    """Analysis for a vehicle health row, enhanced with the vehicle's actual details and readings."""
+    # Get complete analysis with better error handling
+    analysis = get_cached_vehicle_analysis(vehicle_id, *vehicle_analysis_args(vehicle_id, vehicle))
+    return enhance_vehicle_health_analysis(analysis, vehicle_id, vehicle)
+
+def enhance_vehicle_health_analysis(analysis, vehicle_id, vehicle):
+    """Copy of a cached analysis with the vehicle health row's actual details and readings."""
+    brand = vehicle.brand
+    model = vehicle.model
+    year = str(vehicle.year)
+    latest_data = vehicle if vehicle.health_timestamp is not None else None
+    
+    # Enhance analysis with actual vehicle data
+    if "vehicle_data" in analysis:
+        # Build new dicts for the parts we change so the cached analysis stays untouched
+        analysis = dict(analysis)
+        analysis["vehicle_data"] = {
+            **analysis["vehicle_data"],
+            "brand": brand,
+            "model": model,
+            "year": year,
+            "vehicle_id": vehicle_id
+        }
+        
+        if latest_data:
+            analysis["vehicle_data"]["mileage"] = latest_data.mileage
+            
+            # Add health metrics
+            analysis["health_metrics"] = {
+                **analysis.get("health_metrics", {}),
+                "engine_status": latest_data.engine_status or "Good",
+                "oil_level": latest_data.oil_level or 85,
+                "coolant_level": latest_data.coolant_level or 92,
+                "brake_fluid": latest_data.brake_fluid_level or 78,
+                "tire_pressure": {
+                    "front_left": latest_data.tire_pressure_front_left or 32.5,
+                    "front_right": latest_data.tire_pressure_front_right or 32.0,
+                    "rear_left": latest_data.tire_pressure_rear_left or 32.8,
+                    "rear_right": latest_data.tire_pressure_rear_right or 32.2
+                },
+                "battery_health": latest_data.battery_health or 90,
+                "fuel_level": latest_data.fuel_level or 65
+            }
+    
+    return analysis
+
 @app.route("/vehicle-health")
 def vehicle_health_page():
     """Display the vehicle health monitoring page."""
@@ -761,11 +1095,6 @@ def vehicle_health_page():
 def vehicle_health_api():
     """API endpoint to get vehicle health data."""
     try:
-        import logging
-        from utils.ai_insights import get_complete_vehicle_analysis
-        
-        # Set up logging for diagnostics
-        logger = logging.getLogger(__name__)
         logger.info("Vehicle health API request received")
         
         # Get parameters from request
@@ -778,81 +1107,21 @@ def vehicle_health_api():
         
         # Get vehicle data from database
         try:
-            # First try to get vehicle health data from database
-            health_data = db_utils.get_vehicle_health_history(vehicle_id, limit=1)
-            
-            # Then try to get vehicle details
-            vehicle = db_utils.get_vehicle_by_id(vehicle_id)
+            # Get vehicle details and its latest health data as one plain row
+            vehicle = db_utils.get_vehicle_health_row(vehicle_id)
             
             if not vehicle:
-                logger.warning(f"Vehicle with ID {vehicle_id} not found")
+                logger.warning("Vehicle with ID %s not found", vehicle_id)
                 return jsonify({"error": "Vehicle not found"}), 404
                 
-            # Use vehicle data for analysis
-            brand = vehicle.brand
-            model = vehicle.model
-            year = str(vehicle.year)
-            
-            # If we have health data, use it to enhance the analysis
-            condition = ""
-            if health_data and len(health_data) > 0:
-                latest_data = health_data[0]
-                # Build condition string based on health data
-                conditions = []
-                
-                if latest_data.check_engine_light:
-                    conditions.append("check engine light on")
-                    
-                if latest_data.oil_level and latest_data.oil_level < 30:
-                    conditions.append("low oil level")
-                    
-                if latest_data.coolant_level and latest_data.coolant_level < 30:
-                    conditions.append("low coolant level")
-                    
-                if latest_data.engine_temperature and latest_data.engine_temperature > 100:
-                    conditions.append("high engine temperature")
-                    
-                condition = ", ".join(conditions)
-            
-            # Log the request parameters
-            logger.info(f"Vehicle health request - ID: '{vehicle_id}', Brand: '{brand}', Model: '{model}', Year: '{year}'")
-            
-            # Get complete analysis with better error handling
-            analysis = get_complete_vehicle_analysis(vehicle_id, brand, model, year, condition)
-            
-            # Enhance analysis with actual vehicle data
-            if "vehicle_data" in analysis:
-                analysis["vehicle_data"]["brand"] = brand
-                analysis["vehicle_data"]["model"] = model
-                analysis["vehicle_data"]["year"] = year
-                analysis["vehicle_data"]["vehicle_id"] = vehicle_id
-                
-                if health_data and len(health_data) > 0:
-                    latest_data = health_data[0]
-                    analysis["vehicle_data"]["mileage"] = latest_data.mileage
-                    
-                    # Add health metrics
-                    if "health_metrics" not in analysis:
-                        analysis["health_metrics"] = {}
-                        
-                    analysis["health_metrics"]["engine_status"] = latest_data.engine_status or "Good"
-                    analysis["health_metrics"]["oil_level"] = latest_data.oil_level or 85
-                    analysis["health_metrics"]["coolant_level"] = latest_data.coolant_level or 92
-                    analysis["health_metrics"]["brake_fluid"] = latest_data.brake_fluid_level or 78
-                    analysis["health_metrics"]["tire_pressure"] = {
-                        "front_left": latest_data.tire_pressure_front_left or 32.5,
-                        "front_right": latest_data.tire_pressure_front_right or 32.0,
-                        "rear_left": latest_data.tire_pressure_rear_left or 32.8,
-                        "rear_right": latest_data.tire_pressure_rear_right or 32.2
-                    }
-                    analysis["health_metrics"]["battery_health"] = latest_data.battery_health or 90
-                    analysis["health_metrics"]["fuel_level"] = latest_data.fuel_level or 65
+            # Get complete analysis enhanced with the vehicle's details and latest readings
+            analysis = build_vehicle_health_analysis(vehicle_id, vehicle)
             
             # Return the enhanced analysis as JSON
             return jsonify(analysis)
             
         except Exception as analysis_error:
-            logger.error(f"Error generating vehicle analysis: {str(analysis_error)}")
+            logger.error("Error generating vehicle analysis: %s", analysis_error)
             return jsonify({
                 "error": "Unable to analyze vehicle health at this time",
                 "vehicle_data": {
@@ -861,11 +1130,56 @@ def vehicle_health_api():
                 }
             }), 500
         
-    except Exception as e:
-        print(f"Unexpected error in vehicle health API: {str(e)}")
+    except Exception:
+        logger.exception("Unexpected error in vehicle health API")
+        return jsonify({"error": "An unexpected error occurred while analyzing vehicle health"}), 500
+
+# Most vehicles one health batch request may ask for
+MAX_HEALTH_BATCH = 50
+
+@app.route("/api/vehicle-health/batch")
+def vehicle_health_batch_api():
+    """API endpoint to get health analyses for several vehicles (?ids=1,2,3) at once."""
+    try:
+        try:
+            vehicle_ids = list(dict.fromkeys(int(i) for i in request.args.get("ids", "").split(",") if i.strip()))
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of vehicle IDs"}), 400
+        
+        if not vehicle_ids:
+            return jsonify({"error": "At least one vehicle ID is required"}), 400
+        if len(vehicle_ids) > MAX_HEALTH_BATCH:
+            return jsonify({"error": f"At most {MAX_HEALTH_BATCH} vehicle IDs per request"}), 400
+        
+        # Every vehicle's details and latest health data in one round trip
+        rows = db_utils.get_vehicle_health_rows(vehicle_ids)
+        
+        # Serve what's cached; the rest go through the fleet analysis, which diagnoses
+        # AI_BATCH_SIZE vehicles per LLM prompt and runs the prompts concurrently
+        vehicles = [(str(row.vehicle_id), row, vehicle_analysis_args(str(row.vehicle_id), row)) for row in rows]
+        cache_keys = {vehicle_id: vehicle_analysis_cache_key(vehicle_id, *args) for vehicle_id, _, args in vehicles}
+        analyses = {vehicle_id: lookup_vehicle_analysis(cache_keys[vehicle_id]) for vehicle_id, _, _ in vehicles}
+        missing = [(vehicle_id, args) for vehicle_id, _, args in vehicles if analyses[vehicle_id] is None]
+        if missing:
+            fleet_analyses = analyze_fleet_threaded([
+                {"vehicle_id": vehicle_id, "brand": brand, "model": model, "year": year, "condition": condition}
+                for vehicle_id, (brand, model, year, condition) in missing
+            ])
+            for (vehicle_id, args), analysis in zip(missing, fleet_analyses):
+                store_vehicle_analysis(cache_keys[vehicle_id], analysis)
+                analyses[vehicle_id] = analysis
+        
+        return jsonify({
+            vehicle_id: enhance_vehicle_health_analysis(analyses[vehicle_id], vehicle_id, row)
+            for vehicle_id, row, _ in vehicles
+        })
+    except Exception:
+        logger.exception("Unexpected error in vehicle health batch API")
         return jsonify({"error": "An unexpected error occurred while analyzing vehicle health"}), 500
 
 if __name__ == "__main__":
+    # Production runs under gunicorn (see gunicorn.conf.py); running the file directly uses
+    # the Werkzeug server, with the debugger and reloader only when FLASK_ENV=development
     # Use environment variable PORT if provided, otherwise default to 8080
     port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_ENV") == "development")
@@ -1,158 +1,184 @@
-import random
-import string
-import datetime
+import secrets
+from sqlalchemy import and_, bindparam, func, lambda_stmt, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
 from database import (
-    get_session, User, Vehicle, MaintenanceCenter, Service, 
+    engine, hash_password, session_scope, utcnow, verify_password, User, Vehicle, MaintenanceCenter, Service, 
     MaintenanceAppointment, MaintenanceRecord, SavedLocation,
     VehicleHealthData, ChatSession, ChatMessage
 )
 
+# Email lookups for sign-in and account checks, as lambda statements so SQLAlchemy
+# caches them by code location instead of rebuilding and hashing the query every call
+USER_BY_EMAIL_STMT = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
+USER_CREDENTIALS_STMT = lambda_stmt(
+    lambda: select(User.id, User.name, User.email, User.password_hash)
+    .where(User.email == bindparam("email"))
+)
+
 def get_user_by_email(email):
     """Get a user by their email address"""
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.email == email).first()
+    with session_scope() as session:
+        user = session.execute(USER_BY_EMAIL_STMT, {"email": email}).scalar_one_or_none()
         return user
-    finally:
-        session.close()
 
 def get_user_by_id(user_id):
     """Get a user by their ID"""
-    session = get_session()
-    try:
-        user = session.query(User).filter(User.id == user_id).first()
+    with session_scope() as session:
+        user = session.get(User, user_id)
         return user
-    finally:
-        session.close()
         
 def update_user_profile(user_id, name=None, phone=None, preferred_language=None, profile_picture=None):
     """Update a user's profile information"""
-    session = get_session()
     try:
-        user = session.query(User).filter(User.id == user_id).first()
-        if not user:
-            return None, "User not found"
-            
-        # Update fields if provided
-        if name:
-            user.name = name
-        if phone:
-            user.phone = phone
-        if preferred_language:
-            user.preferred_language = preferred_language
-        if profile_picture:
-            user.profile_picture = profile_picture
+        with session_scope() as session:
+            # Update fields if provided; updated_at is set by the column's onupdate
+            values = {}
+            if name:
+                values['name'] = name
+            if phone:
+                values['phone'] = phone
+            if preferred_language:
+                values['preferred_language'] = preferred_language
+            if profile_picture:
+                values['profile_picture'] = profile_picture
             
-        user.updated_at = datetime.datetime.utcnow()
-        session.commit()
-        return user, None
+            stmt = update(User).where(User.id == user_id).values(**values)
+            if engine.dialect.update_returning:
+                # One UPDATE ... RETURNING instead of loading the user first
+                user = session.scalars(stmt.returning(User)).first()
+            else:
+                # No RETURNING on this dialect (e.g. MySQL): update, then load the user
+                user = session.get(User, user_id) if session.execute(stmt).rowcount else None
+            if not user:
+                return None, "User not found"
+            return user, None
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
+
+# INSERT constructs that support ON CONFLICT DO NOTHING, by dialect
+CONFLICT_INSERTS = {'postgresql': pg_insert, 'sqlite': sqlite_insert}
 
 def create_user(name, email, password, phone=None, language="en"):
-    """Create a new user"""
-    session = get_session()
+    """Create a new user
+    
+    A single INSERT ... ON CONFLICT (email) DO NOTHING RETURNING, so an existing email
+    is detected without a separate lookup and two concurrent signups can't both succeed.
+    Dialects without ON CONFLICT (e.g. MySQL) look the email up first instead, with the
+    unique email index still rejecting a concurrent duplicate.
+    """
     try:
-        # Check if user already exists
-        existing_user = session.query(User).filter(User.email == email).first()
-        if existing_user:
-            return None, "User with this email already exists"
-        
-        # Create new user
-        user = User(
-            name=name,
-            email=email,
-            phone=phone,
-            preferred_language=language,
-            is_active=True,
-            last_login=datetime.datetime.utcnow()
-        )
-        user.set_password(password)
-        
-        session.add(user)
-        session.commit()
-        return user, None
+        with session_scope() as session:
+            values = dict(
+                name=name,
+                email=email,
+                password_hash=hash_password(password),
+                phone=phone,
+                preferred_language=language,
+                is_active=True,
+                last_login=utcnow()
+            )
+            
+            insert = CONFLICT_INSERTS.get(engine.dialect.name)
+            if insert is None:
+                if session.execute(USER_BY_EMAIL_STMT, {"email": email}).first():
+                    return None, "User with this email already exists"
+                user = User(**values)
+                session.add(user)
+                session.flush()
+                # last_login was set to a SQL expression, so load the value it produced
+                session.refresh(user)
+                return user, None
+            
+            stmt = insert(User).values(**values)\
+                .on_conflict_do_nothing(index_elements=[User.email])\
+                .returning(User)
+            
+            user = session.scalars(stmt).first()
+            if not user:
+                return None, "User with this email already exists"
+            return user, None
+    except IntegrityError:
+        return None, "User with this email already exists"
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 def authenticate_user(email, password):
-    """Authenticate a user with email and password"""
-    session = get_session()
+    """Authenticate a user with email and password
+    
+    Returns a row with the user's id, name and email rather than the full User.
+    """
     try:
-        user = session.query(User).filter(User.email == email).first()
-        if not user or not user.check_password(password):
-            return None, "Invalid email or password"
-        
-        # Update last login time
-        user.last_login = datetime.datetime.utcnow()
-        session.commit()
-        
-        return user, None
+        with session_scope() as session:
+            # Only the columns the check and the caller need
+            user = session.execute(USER_CREDENTIALS_STMT, {"email": email}).first()
+            if not user:
+                return None, "Invalid email or password"
+            
+            valid, new_hash = verify_password(user.password_hash, password)
+            if not valid:
+                return None, "Invalid email or password"
+            
+            # Update last login time (and upgrade the password hash if needed) in place
+            values = {'last_login': utcnow()}
+            if new_hash:
+                values['password_hash'] = new_hash
+            session.execute(update(User).where(User.id == user.id).values(**values))
+            
+            return user, None
     except Exception as e:
         return None, str(e)
-    finally:
-        session.close()
 
 def add_vehicle(user_id, brand, model, year, vin=None, license_plate=None, color=None, mileage=None, fuel_type=None, transmission=None):
     """Add a vehicle for a user"""
-    session = get_session()
     try:
-        # Check if user exists
-        user = session.query(User).filter(User.id == user_id).first()
-        if not user:
-            return None, "User not found"
+        with session_scope() as session:
+            # Check if user exists
+            user = session.get(User, user_id)
+            if not user:
+                return None, "User not found"
         
-        # Create vehicle
-        vehicle = Vehicle(
-            user_id=user_id,
-            brand=brand,
-            model=model,
-            year=year,
-            vin=vin,
-            license_plate=license_plate,
-            color=color,
-            mileage=mileage,
-            fuel_type=fuel_type,
-            transmission=transmission
-        )
+            # Create vehicle
+            vehicle = Vehicle(
+                user_id=user_id,
+                brand=brand,
+                model=model,
+                year=year,
+                vin=vin,
+                license_plate=license_plate,
+                color=color,
+                mileage=mileage,
+                fuel_type=fuel_type,
+                transmission=transmission
+            )
         
-        session.add(vehicle)
-        session.commit()
-        return vehicle, None
+            session.add(vehicle)
+            return vehicle, None
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 def get_user_vehicles(user_id):
     """Get all vehicles for a user"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         vehicles = session.query(Vehicle).filter(Vehicle.user_id == user_id).all()
         return vehicles
-    finally:
-        session.close()
+        
+def iter_user_vehicles(user_id, batch_size=500):
+    """Yield a user's vehicles in batches, keeping the session open while iterating"""
+    with session_scope() as session:
+        yield from session.query(Vehicle).filter(Vehicle.user_id == user_id).yield_per(batch_size)
         
 def get_vehicle_by_id(vehicle_id):
     """Get a vehicle by ID"""
-    session = get_session()
-    try:
-        vehicle = session.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
+    with session_scope() as session:
+        vehicle = session.get(Vehicle, vehicle_id)
         return vehicle
-    finally:
-        session.close()
 
 def get_maintenance_centers(limit=None, offset=0):
     """Get maintenance centers with optional pagination"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         query = session.query(MaintenanceCenter).order_by(MaintenanceCenter.rating.desc())
         
         if limit:
@@ -160,74 +186,72 @@ def get_maintenance_centers(limit=None, offset=0):
             
         centers = query.all()
         return centers
-    finally:
-        session.close()
 
 def get_center_by_id(center_id):
     """Get a maintenance center by ID"""
-    session = get_session()
-    try:
-        center = session.query(MaintenanceCenter).filter(MaintenanceCenter.id == center_id).first()
+    with session_scope() as session:
+        center = session.get(MaintenanceCenter, center_id)
+        return center
+
+def get_center_with_services(center_id):
+    """Get a maintenance center by ID with its services loaded in the same query"""
+    with session_scope() as session:
+        center = session.query(MaintenanceCenter)\
+            .options(joinedload(MaintenanceCenter.services))\
+            .filter(MaintenanceCenter.id == center_id)\
+            .first()
         return center
-    finally:
-        session.close()
 
 def get_center_services(center_id):
     """Get services offered by a specific maintenance center"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         services = session.query(Service).filter(Service.center_id == center_id).all()
         return services
-    finally:
-        session.close()
 
 def book_appointment(user_id, vehicle_id, center_id, service_id, appointment_date, notes=None):
     """Book a maintenance appointment"""
-    session = get_session()
     try:
-        # Validate all references exist
-        user = session.query(User).filter(User.id == user_id).first()
-        if not user:
-            return None, "User not found"
+        with session_scope() as session:
+            # Validate all references exist in one query; a missing one comes back as None
+            refs = session.query(User.id, Vehicle.id, MaintenanceCenter.id, Service.id)\
+                .select_from(User)\
+                .outerjoin(Vehicle, and_(Vehicle.id == vehicle_id, Vehicle.user_id == User.id))\
+                .outerjoin(MaintenanceCenter, MaintenanceCenter.id == center_id)\
+                .outerjoin(Service, and_(Service.id == service_id, Service.center_id == MaintenanceCenter.id))\
+                .filter(User.id == user_id)\
+                .first()
+            if not refs:
+                return None, "User not found"
             
-        vehicle = session.query(Vehicle).filter(Vehicle.id == vehicle_id, Vehicle.user_id == user_id).first()
-        if not vehicle:
-            return None, "Vehicle not found or does not belong to user"
+            _, found_vehicle_id, found_center_id, found_service_id = refs
+            if found_vehicle_id is None:
+                return None, "Vehicle not found or does not belong to user"
             
-        center = session.query(MaintenanceCenter).filter(MaintenanceCenter.id == center_id).first()
-        if not center:
-            return None, "Maintenance center not found"
+            if found_center_id is None:
+                return None, "Maintenance center not found"
             
-        service = None
-        if service_id:
-            service = session.query(Service).filter(Service.id == service_id, Service.center_id == center_id).first()
-            if not service:
+            if service_id and found_service_id is None:
                 return None, "Service not found or not offered by the center"
         
-        # Create appointment
-        appointment = MaintenanceAppointment(
-            user_id=user_id,
-            vehicle_id=vehicle_id,
-            center_id=center_id,
-            service_id=service_id,
-            appointment_date=appointment_date,
-            status="scheduled",
-            notes=notes
-        )
+            # Create appointment
+            appointment = MaintenanceAppointment(
+                user_id=user_id,
+                vehicle_id=vehicle_id,
+                center_id=center_id,
+                service_id=service_id,
+                appointment_date=appointment_date,
+                status="scheduled",
+                notes=notes
+            )
         
-        session.add(appointment)
-        session.commit()
-        return appointment, None
+            session.add(appointment)
+            return appointment, None
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 def get_user_appointments(user_id, status=None):
     """Get appointments for a user with optional status filter"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         query = session.query(MaintenanceAppointment).filter(MaintenanceAppointment.user_id == user_id)
         
         if status:
@@ -235,162 +259,265 @@ def get_user_appointments(user_id, status=None):
             
         appointments = query.order_by(MaintenanceAppointment.appointment_date).all()
         return appointments
-    finally:
-        session.close()
+
+def iter_user_appointments(user_id, status=None, batch_size=500):
+    """Yield a user's appointments in batches, keeping the session open while iterating"""
+    with session_scope() as session:
+        query = session.query(MaintenanceAppointment).filter(MaintenanceAppointment.user_id == user_id)
+        
+        if status:
+            query = query.filter(MaintenanceAppointment.status == status)
+            
+        yield from query.order_by(MaintenanceAppointment.appointment_date).yield_per(batch_size)
 
 def save_user_location(user_id, name, latitude, longitude, address=None, is_favorite=False):
     """Save a location for a user"""
-    session = get_session()
     try:
-        # Check if user exists
-        user = session.query(User).filter(User.id == user_id).first()
-        if not user:
-            return None, "User not found"
+        with session_scope() as session:
+            # Check if user exists
+            user = session.get(User, user_id)
+            if not user:
+                return None, "User not found"
         
-        # Create saved location
-        location = SavedLocation(
-            user_id=user_id,
-            name=name,
-            address=address,
-            latitude=latitude,
-            longitude=longitude,
-            is_favorite=is_favorite
-        )
+            # Create saved location
+            location = SavedLocation(
+                user_id=user_id,
+                name=name,
+                address=address,
+                latitude=latitude,
+                longitude=longitude,
+                is_favorite=is_favorite
+            )
         
-        session.add(location)
-        session.commit()
-        return location, None
+            session.add(location)
+            return location, None
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 def get_user_saved_locations(user_id):
     """Get all saved locations for a user"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         locations = session.query(SavedLocation).filter(SavedLocation.user_id == user_id).all()
         return locations
-    finally:
-        session.close()
 
 def save_vehicle_health_data(vehicle_id, data):
     """Save health data for a vehicle"""
-    session = get_session()
     try:
-        # Check if vehicle exists
-        vehicle = session.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-        if not vehicle:
-            return None, "Vehicle not found"
+        with session_scope() as session:
+            # Check if vehicle exists
+            vehicle = session.get(Vehicle, vehicle_id)
+            if not vehicle:
+                return None, "Vehicle not found"
         
-        # Create health data record
-        health_data = VehicleHealthData(
-            vehicle_id=vehicle_id,
-            **data
-        )
+            # Create health data record
+            health_data = VehicleHealthData(
+                vehicle_id=vehicle_id,
+                **data
+            )
         
-        session.add(health_data)
-        session.commit()
-        return health_data, None
+            session.add(health_data)
+            return health_data, None
     except Exception as e:
-        session.rollback()
         return None, str(e)
-    finally:
-        session.close()
 
 def get_vehicle_health_history(vehicle_id, limit=10):
-    """Get health history for a vehicle with limit"""
-    session = get_session()
-    try:
-        health_data = session.query(VehicleHealthData)\
-            .filter(VehicleHealthData.vehicle_id == vehicle_id)\
-            .order_by(VehicleHealthData.timestamp.desc())\
-            .limit(limit)\
-            .all()
-        return health_data
-    finally:
-        session.close()
+    """Get health history for a vehicle with limit, newest first, as to_dict()-style dicts
+    
+    Reads the table with a Core select, so no ORM objects are built for rows that are
+    only going to be serialized.
+    """
+    health_table = VehicleHealthData.__table__
+    stmt = select(health_table)\
+        .where(health_table.c.vehicle_id == vehicle_id)\
+        .order_by(health_table.c.timestamp.desc())\
+        .limit(limit)
+    with session_scope() as session:
+        history = [dict(row) for row in session.execute(stmt).mappings()]
+    
+    # Same values as VehicleHealthData.to_dict()
+    for record in history:
+        record['timestamp'] = record['timestamp'].isoformat()
+        record['diagnostic_codes'] = record['diagnostic_codes'] or []
+    return history
+
+# Vehicle details plus the fields of its latest health record that the health API reads;
+# built as a lambda statement so SQLAlchemy caches it by code location and skips
+# rebuilding the cache key on every call
+VEHICLE_HEALTH_STMT = lambda_stmt(lambda: select(
+        Vehicle.brand,
+        Vehicle.model,
+        Vehicle.year,
+        VehicleHealthData.timestamp.label("health_timestamp"),
+        VehicleHealthData.mileage,
+        VehicleHealthData.engine_status,
+        VehicleHealthData.oil_level,
+        VehicleHealthData.coolant_level,
+        VehicleHealthData.brake_fluid_level,
+        VehicleHealthData.tire_pressure_front_left,
+        VehicleHealthData.tire_pressure_front_right,
+        VehicleHealthData.tire_pressure_rear_left,
+        VehicleHealthData.tire_pressure_rear_right,
+        VehicleHealthData.battery_health,
+        VehicleHealthData.fuel_level,
+        VehicleHealthData.engine_temperature,
+        VehicleHealthData.check_engine_light
+    )
+    .outerjoin(VehicleHealthData, VehicleHealthData.vehicle_id == Vehicle.id)
+    .where(Vehicle.id == bindparam("vehicle_id"))
+    .order_by(VehicleHealthData.timestamp.desc())
+    .limit(1)
+)
+
+def get_vehicle_health_row(vehicle_id):
+    """Get a vehicle's details and latest health readings as a single row (None if no vehicle)
+    
+    Health columns are None when the vehicle has no health data; check health_timestamp.
+    """
+    with session_scope() as session:
+        return session.execute(VEHICLE_HEALTH_STMT, {"vehicle_id": vehicle_id}).first()
+
+def get_vehicle_health_rows(vehicle_ids):
+    """Get several vehicles' details and latest health readings in one query
+    
+    Same columns as get_vehicle_health_row() plus vehicle_id; vehicles that don't exist
+    are simply absent from the result.
+    """
+    with session_scope() as session:
+        # Rank each vehicle's health records newest first and keep only the latest
+        ranked = select(
+                VehicleHealthData,
+                func.row_number().over(
+                    partition_by=VehicleHealthData.vehicle_id,
+                    order_by=VehicleHealthData.timestamp.desc()
+                ).label("rn")
+            )\
+            .where(VehicleHealthData.vehicle_id.in_(vehicle_ids))\
+            .subquery()
+        
+        stmt = select(
+                Vehicle.id.label("vehicle_id"),
+                Vehicle.brand,
+                Vehicle.model,
+                Vehicle.year,
+                ranked.c.timestamp.label("health_timestamp"),
+                ranked.c.mileage,
+                ranked.c.engine_status,
+                ranked.c.oil_level,
+                ranked.c.coolant_level,
+                ranked.c.brake_fluid_level,
+                ranked.c.tire_pressure_front_left,
+                ranked.c.tire_pressure_front_right,
+                ranked.c.tire_pressure_rear_left,
+                ranked.c.tire_pressure_rear_right,
+                ranked.c.battery_health,
+                ranked.c.fuel_level,
+                ranked.c.engine_temperature,
+                ranked.c.check_engine_light
+            )\
+            .outerjoin(ranked, (ranked.c.vehicle_id == Vehicle.id) & (ranked.c.rn == 1))\
+            .where(Vehicle.id.in_(vehicle_ids))
+        return session.execute(stmt).all()
 
 def create_chat_session(user_id=None, vehicle_id=None):
     """Create a new chat session"""
-    session = get_session()
     try:
-        # Generate a unique session key
-        session_key = ''.join(random.choices(string.ascii_uppercase + string.digits, k=20))
+        with session_scope() as session:
+            # Generate an unguessable, unique session key (20 URL-safe characters)
+            session_key = secrets.token_urlsafe(15)
         
-        chat_session = ChatSession(
-            user_id=user_id,
-            vehicle_id=vehicle_id,
-            session_key=session_key,
-            start_time=datetime.datetime.utcnow(),
-            is_active=True
-        )
+            chat_session = ChatSession(
+                user_id=user_id,
+                vehicle_id=vehicle_id,
+                session_key=session_key,
+                is_active=True
+            )
         
-        session.add(chat_session)
-        session.commit()
-        return chat_session
+            session.add(chat_session)
+            return chat_session
     except Exception as e:
-        session.rollback()
         return None
-    finally:
-        session.close()
 
 def get_chat_session(session_key):
     """Get a chat session by its key"""
-    session = get_session()
-    try:
+    with session_scope() as session:
         chat_session = session.query(ChatSession).filter(ChatSession.session_key == session_key).first()
         return chat_session
-    finally:
-        session.close()
 
 def save_chat_message(session_id, message, is_bot=False, language="en"):
     """Save a chat message"""
-    session = get_session()
     try:
-        chat_message = ChatMessage(
-            session_id=session_id,
-            message=message,
-            is_bot=is_bot,
-            timestamp=datetime.datetime.utcnow(),
-            language=language
-        )
+        with session_scope() as session:
+            chat_message = ChatMessage(
+                session_id=session_id,
+                message=message,
+                is_bot=is_bot,
+                language=language
+            )
         
-        session.add(chat_message)
-        session.commit()
-        return chat_message
+            session.add(chat_message)
+            return chat_message
     except Exception as e:
-        session.rollback()
         return None
-    finally:
-        session.close()
 
-def get_chat_messages(session_id):
-    """Get all messages for a chat session"""
-    session = get_session()
+def save_chat_messages(session_id, messages, language="en"):
+    """Save several chat messages in one INSERT and one commit
+    
+    messages is a list of dicts with "message" and optionally "is_bot" and "language";
+    use it to write a whole turn (e.g. a streamed bot reply) at once. Returns how many
+    messages were saved, or None on error.
+    """
+    rows = [
+        {
+            "session_id": session_id,
+            "message": m["message"],
+            "is_bot": m.get("is_bot", False),
+            "language": m.get("language", language)
+        }
+        for m in messages
+    ]
+    if not rows:
+        return 0
+    
     try:
-        messages = session.query(ChatMessage)\
-            .filter(ChatMessage.session_id == session_id)\
-            .order_by(ChatMessage.timestamp)\
-            .all()
+        with session_scope() as session:
+            session.bulk_insert_mappings(ChatMessage, rows)
+            return len(rows)
+    except Exception as e:
+        return None
+
+def get_chat_messages(session_id, after=None, limit=50):
+    """Get a chat session's messages in order, at most limit of them
+    
+    Without after, returns the latest limit messages. Pass the (timestamp, id) of the
+    last message already seen as after to fetch the ones following it; the id breaks
+    ties between messages saved in the same transaction, which share a timestamp. Both
+    are range scans on (session_id, timestamp) however long the chat gets.
+    """
+    with session_scope() as session:
+        query = session.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        
+        if after:
+            after_timestamp, after_id = after
+            query = query.filter(or_(
+                ChatMessage.timestamp > after_timestamp,
+                and_(ChatMessage.timestamp == after_timestamp, ChatMessage.id > after_id)
+            ))
+            return query.order_by(ChatMessage.timestamp, ChatMessage.id).limit(limit).all()
+        
+        # The tail of the conversation, newest first, then put back in order
+        messages = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit).all()
+        messages.reverse()
         return messages
-    finally:
-        session.close()
 
 def end_chat_session(session_key):
     """End a chat session"""
-    session = get_session()
     try:
-        chat_session = session.query(ChatSession).filter(ChatSession.session_key == session_key).first()
-        if chat_session:
-            chat_session.is_active = False
-            chat_session.end_time = datetime.datetime.utcnow()
-            session.commit()
-            return True
-        return False
+        with session_scope() as session:
+            result = session.execute(
+                update(ChatSession)
+                .where(ChatSession.session_key == session_key)
+                .values(is_active=False, end_time=utcnow())
+            )
+            return result.rowcount > 0
     except Exception:
-        session.rollback()
-        return False
-    finally:
-        session.close()
\ No newline at end of file
+        return False
\ No newline at end of file
@@ -1,7 +1,6 @@
 import os
-import json
 import datetime
-from database import init_db, get_session, User, Vehicle, MaintenanceCenter, Service
+from database import init_db, session_scope, User, Vehicle, MaintenanceCenter, Service
 
 def seed_maintenance_centers(session):
     """Add sample maintenance centers to the database"""
@@ -20,8 +19,8 @@ def seed_maintenance_centers(session):
             "latitude": 25.2048,
             "longitude": 55.2708,
             "rating": 4.9,
-            "specialties": json.dumps(["BMW", "Mercedes", "Audi", "Porsche"]),
-            "hours_of_operation": json.dumps({
+            "specialties": ["BMW", "Mercedes", "Audi", "Porsche"],
+            "hours_of_operation": {
                 "Monday": "8:00 AM - 8:00 PM",
                 "Tuesday": "8:00 AM - 8:00 PM",
                 "Wednesday": "8:00 AM - 8:00 PM",
@@ -29,7 +28,7 @@ def seed_maintenance_centers(session):
                 "Friday": "8:00 AM - 6:00 PM",
                 "Saturday": "9:00 AM - 5:00 PM",
                 "Sunday": "Closed"
-            })
+            }
         },
         {
             "name": "Luxury Motors Service Center",
@@ -44,8 +43,8 @@ def seed_maintenance_centers(session):
             "latitude": 24.4539,
             "longitude": 54.3773,
             "rating": 4.8,
-            "specialties": json.dumps(["Bentley", "Rolls Royce", "Ferrari", "Lamborghini"]),
-            "hours_of_operation": json.dumps({
+            "specialties": ["Bentley", "Rolls Royce", "Ferrari", "Lamborghini"],
+            "hours_of_operation": {
                 "Monday": "9:00 AM - 7:00 PM",
                 "Tuesday": "9:00 AM - 7:00 PM",
                 "Wednesday": "9:00 AM - 7:00 PM",
@@ -53,7 +52,7 @@ def seed_maintenance_centers(session):
                 "Friday": "9:00 AM - 5:00 PM",
                 "Saturday": "10:00 AM - 4:00 PM",
                 "Sunday": "Closed"
-            })
+            }
         },
         {
             "name": "Executive Auto Clinic",
@@ -68,8 +67,8 @@ def seed_maintenance_centers(session):
             "latitude": 25.3463,
             "longitude": 55.4209,
             "rating": 4.7,
-            "specialties": json.dumps(["Jaguar", "Land Rover", "Lexus", "Infiniti"]),
-            "hours_of_operation": json.dumps({
+            "specialties": ["Jaguar", "Land Rover", "Lexus", "Infiniti"],
+            "hours_of_operation": {
                 "Monday": "8:30 AM - 7:30 PM",
                 "Tuesday": "8:30 AM - 7:30 PM",
                 "Wednesday": "8:30 AM - 7:30 PM",
@@ -77,27 +76,23 @@ def seed_maintenance_centers(session):
                 "Friday": "8:30 AM - 5:30 PM",
                 "Saturday": "9:30 AM - 3:30 PM",
                 "Sunday": "Closed"
-            })
+            }
         }
     ]
     
-    for center_data in centers:
-        center = MaintenanceCenter(**center_data)
-        session.add(center)
-    
-    session.commit()
+    # One multi-row INSERT instead of an ORM add() per center
+    session.bulk_insert_mappings(MaintenanceCenter, centers)
+    session.flush()
     return len(centers)
 
 def seed_services(session):
     """Add sample services to the database"""
     
-    # Get all centers
-    centers = session.query(MaintenanceCenter).all()
-    if not centers:
+    # Get all center IDs
+    center_ids = [center_id for center_id, in session.query(MaintenanceCenter.id)]
+    if not center_ids:
         return 0
     
-    services_count = 0
-    
     # Common services for all centers
     common_services = [
         {
@@ -132,13 +127,6 @@ def seed_services(session):
         }
     ]
     
-    # Add common services to all centers
-    for center in centers:
-        for service_data in common_services:
-            service = Service(center_id=center.id, **service_data)
-            session.add(service)
-            services_count += 1
-    
     # Specialized services per center
     specialized_services = {
         1: [  # First center (index 0)
@@ -185,15 +173,20 @@ def seed_services(session):
         ]
     }
     
-    # Add specialized services to respective centers
-    for center_id, services in specialized_services.items():
-        for service_data in services:
-            service = Service(center_id=center_id, **service_data)
-            session.add(service)
-            services_count += 1
-    
-    session.commit()
-    return services_count
+    # Common services for every center plus each center's specialized ones, inserted in
+    # one multi-row INSERT
+    service_rows = [
+        dict(center_id=center_id, **service_data)
+        for center_id in center_ids
+        for service_data in common_services
+    ] + [
+        dict(center_id=center_id, **service_data)
+        for center_id, services in specialized_services.items()
+        for service_data in services
+    ]
+    session.bulk_insert_mappings(Service, service_rows)
+    session.flush()
+    return len(service_rows)
 
 def create_admin_user(session):
     """Create an admin user for testing"""
@@ -223,35 +216,37 @@ def create_admin_user(session):
     
     admin.vehicles.append(admin_vehicle)
     session.add(admin)
-    session.commit()
+    session.flush()
     
     return admin.id
 
+def seed(session):
+    """Add all sample data in the given session; the caller commits it as one transaction"""
+    print("Seeding maintenance centers...")
+    centers_count = seed_maintenance_centers(session)
+    print(f"Added {centers_count} maintenance centers.")
+    
+    print("Seeding services...")
+    services_count = seed_services(session)
+    print(f"Added {services_count} services.")
+    
+    print("Creating admin user...")
+    admin_id = create_admin_user(session)
+    print(f"Created admin user with ID: {admin_id}")
+
 def main():
     """Initialize and seed the database"""
     print("Initializing database...")
     init_db()
     
-    session = get_session()
     try:
-        print("Seeding maintenance centers...")
-        centers_count = seed_maintenance_centers(session)
-        print(f"Added {centers_count} maintenance centers.")
-        
-        print("Seeding services...")
-        services_count = seed_services(session)
-        print(f"Added {services_count} services.")
-        
-        print("Creating admin user...")
-        admin_id = create_admin_user(session)
-        print(f"Created admin user with ID: {admin_id}")
+        # Either all of the seed data is committed or none of it
+        with session_scope() as session:
+            seed(session)
         
         print("Database initialization complete.")
     except Exception as e:
         print(f"Error initializing database: {e}")
-        session.rollback()
-    finally:
-        session.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,8 +3,8 @@ import sys
 import time
 
 # Import the database modules
-from database import init_db, Base, engine
-from init_database import main as seed_data
+from database import init_db, Base, engine, session_scope
+from init_database import seed as seed_data
 
 def initialize_database():
     """Initialize and seed the database."""
@@ -22,7 +22,9 @@ def initialize_database():
     # Seed the database with initial data
     print("Seeding database with initial data...")
     try:
-        seed_data()
+        # One transaction for all seed data, committed once at the end
+        with session_scope() as session:
+            seed_data(session)
         print("Database seeded successfully.")
     except Exception as e:
         print(f"Error seeding database: {e}")
@@ -7,10 +7,18 @@ import json
 import logging
 import random
 import datetime
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple, Union
 
-# Import OpenAI helper
-from utils.openai_helper import generate_diagnostic_response
+import numpy as np
+from cachetools import TTLCache, cached
+
+# Import Gemini helper (replaces the removed OpenAI helper; same signature)
+from utils.gemini_helper import (
+    generate_fallback_diagnostic, generate_primary_diagnostic, generate_primary_diagnostics
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -74,6 +82,48 @@ VEHICLE_PATTERNS = {
     }
 }
 
+# Sensor readings as aligned arrays per condition (structure of arrays), with sensors
+# the condition doesn't affect taking their normal pattern
+SENSOR_ORDER = tuple(VEHICLE_PATTERNS['normal'])
+SENSOR_UNITS = tuple(THRESHOLDS[sensor]['unit'] for sensor in SENSOR_ORDER)
+
+def _pattern_array(pattern: Dict[str, Dict[str, float]], key: str) -> np.ndarray:
+    """One pattern parameter ('base' or 'variance') for every sensor, in SENSOR_ORDER"""
+    return np.array(
+        [pattern.get(sensor, VEHICLE_PATTERNS['normal'][sensor])[key] for sensor in SENSOR_ORDER],
+        dtype=np.float64
+    )
+
+SENSOR_BASES = {condition: _pattern_array(pattern, 'base') for condition, pattern in VEHICLE_PATTERNS.items()}
+SENSOR_VARIANCES = {condition: _pattern_array(pattern, 'variance') for condition, pattern in VEHICLE_PATTERNS.items()}
+
+# Shared PCG64 generator for sensor noise (its methods are thread-safe)
+sensor_rng = np.random.default_rng()
+
+def get_sensor_readings_array(condition: str = 'normal') -> np.ndarray:
+    """
+    Generate one set of sensor readings for a condition as an array aligned with SENSOR_ORDER,
+    rounded to 2 decimals like the readings in get_sensor_data().
+    """
+    # Use a pattern based on condition, defaulting to normal
+    if condition not in SENSOR_BASES:
+        condition = 'normal'
+    
+    # Generate all readings at once: base value with some randomness
+    noise = sensor_rng.uniform(-1.0, 1.0, size=len(SENSOR_ORDER))
+    return np.round(SENSOR_BASES[condition] + noise * SENSOR_VARIANCES[condition], 2)
+
+def _sensor_data(vehicle_id: str, values: List[float]) -> Dict[str, Any]:
+    """Wrap readings aligned with SENSOR_ORDER in the get_sensor_data() structure"""
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'vehicle_id': vehicle_id,
+        'readings': {
+            sensor: {'value': value, 'unit': unit}
+            for sensor, value, unit in zip(SENSOR_ORDER, values, SENSOR_UNITS)
+        }
+    }
+
 def get_sensor_data(vehicle_id: str, condition: str = 'normal') -> Dict[str, Any]:
     """
     Generate realistic sensor data for a vehicle based on its condition.
@@ -85,39 +135,104 @@ def get_sensor_data(vehicle_id: str, condition: str = 'normal') -> Dict[str, Any
     Returns:
         A dictionary containing sensor readings and metadata
     """
-    # Use a pattern based on condition, defaulting to normal
-    pattern = VEHICLE_PATTERNS.get(condition, VEHICLE_PATTERNS['normal'])
-    
-    # Start with normal data for all sensors
-    normal_pattern = VEHICLE_PATTERNS['normal']
-    data = {}
-    
-    # Add timestamp
-    now = datetime.datetime.now()
-    data['timestamp'] = now.isoformat()
-    data['vehicle_id'] = vehicle_id
-    data['readings'] = {}
-    
-    # Generate readings for all sensors with normal pattern
-    for sensor, params in normal_pattern.items():
-        # If this sensor is affected by the condition, use that pattern instead
-        if sensor in pattern:
-            base = pattern[sensor]['base']
-            variance = pattern[sensor]['variance']
-        else:
-            base = params['base']
-            variance = params['variance']
+    return _sensor_data(vehicle_id, get_sensor_readings_array(condition).tolist())
+
+# (below range, above range) recommendation per sensor; None means no recommendation
+SENSOR_RECOMMENDATIONS = {
+    'oil_pressure': (
+        "Check oil level and refill if necessary. If problem persists, inspect for oil leaks or engine damage.",
+        "High oil pressure detected. Check oil viscosity and possible blockage in the oil system."
+    ),
+    'coolant_temp': (
+        "Engine temperature too low. Check thermostat function.",
+        "Engine overheating. Check coolant level, radiator function, and water pump. Stop driving if temperature continues to rise."
+    ),
+    'battery_voltage': (
+        "Low battery voltage. Check charging system, alternator, and battery condition.",
+        "High battery voltage. Check voltage regulator and charging system."
+    ),
+    'tire_pressure': (
+        "Low tire pressure. Inflate tires to recommended PSI and check for leaks.",
+        "High tire pressure. Reduce to manufacturer recommended PSI."
+    ),
+    'brake_pad_thickness': (
+        "Brake pads critically worn. Replace immediately for safety.",
+        None
+    ),
+    'fuel_pressure': (
+        "Low fuel pressure. Check fuel pump, filter, and pressure regulator.",
+        "High fuel pressure. Inspect pressure regulator and fuel system."
+    ),
+    'transmission_temp': (
+        None,
+        "Transmission overheating. Check fluid level and condition. Avoid towing or heavy loads until resolved."
+    ),
+    'oxygen_sensor': (
+        "Oxygen sensor readings out of range. Check for exhaust leaks, fuel mixture issues, or sensor failure.",
+        "Oxygen sensor readings out of range. Check for exhaust leaks, fuel mixture issues, or sensor failure."
+    )
+}
+
+# Threshold bounds aligned with SENSOR_ORDER, for classifying all readings at once
+THRESHOLD_MINS = np.array([THRESHOLDS[sensor]['min'] for sensor in SENSOR_ORDER], dtype=np.float64)
+THRESHOLD_MAXS = np.array([THRESHOLDS[sensor]['max'] for sensor in SENSOR_ORDER], dtype=np.float64)
+
+# Expected range shown with each anomaly, aligned with SENSOR_ORDER
+EXPECTED_RANGES = tuple(
+    f"{THRESHOLDS[sensor]['min']} - {THRESHOLDS[sensor]['max']} {THRESHOLDS[sensor]['unit']}" for sensor in SENSOR_ORDER
+)
+
+# SENSOR_RECOMMENDATIONS aligned with SENSOR_ORDER, with a generic recommendation for sensors not listed there
+RECOMMENDATIONS_BY_INDEX = tuple(
+    SENSOR_RECOMMENDATIONS.get(
+        sensor, (f"Abnormal {sensor} reading. Schedule inspection with a qualified technician.",) * 2
+    )
+    for sensor in SENSOR_ORDER
+)
+
+# Reading statuses returned by classify_readings()
+STATUS_OK, STATUS_WARNING, STATUS_CRITICAL = 0, 1, 2
+
+def classify_readings(values: np.ndarray) -> np.ndarray:
+    """
+    Classify readings aligned with SENSOR_ORDER against their thresholds.
+    
+    Returns an int8 array of STATUS_OK, STATUS_WARNING (outside the range) or
+    STATUS_CRITICAL (more than 20% outside it); NaN (missing) readings are OK.
+    """
+    out_of_range = (values < THRESHOLD_MINS) | (values > THRESHOLD_MAXS)
+    critical = (values < THRESHOLD_MINS * 0.8) | (values > THRESHOLD_MAXS * 1.2)
+    return out_of_range.astype(np.int8) + (out_of_range & critical)
+
+def _anomaly_entries(values: List[Any], statuses: np.ndarray, timestamp: Optional[str]) -> List[Dict[str, Any]]:
+    """Build anomaly entries for the readings (aligned with SENSOR_ORDER) that classify_readings() flagged"""
+    anomalies = []
+    
+    # Only readings outside their thresholds need an anomaly entry
+    for index in np.flatnonzero(statuses):
+        sensor = SENSOR_ORDER[index]
+        value = values[index]
         
-        # Generate value with some randomness
-        value = base + (random.random() * 2 - 1) * variance
+        severity = "critical" if statuses[index] == STATUS_CRITICAL else "warning"
         
-        # Add unit information
-        data['readings'][sensor] = {
-            'value': round(value, 2),
-            'unit': THRESHOLDS[sensor]['unit']
+        anomaly = {
+            'sensor': sensor,
+            'current_value': value,
+            'unit': SENSOR_UNITS[index],
+            'expected_range': EXPECTED_RANGES[index],
+            'severity': severity,
+            'timestamp': timestamp
         }
+        
+        # Generate recommendations based on which side of the range the reading is on
+        low_message, high_message = RECOMMENDATIONS_BY_INDEX[index]
+        recommendation = low_message if value < THRESHOLD_MINS[index] else high_message
+        if recommendation:
+            anomaly['recommendation'] = recommendation
+        
+        anomalies.append(anomaly)
     
-    return data
+    return anomalies
 
 def detect_anomalies(sensor_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
@@ -129,75 +244,61 @@ def detect_anomalies(sensor_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns:
         List of detected anomalies with severity and recommendations
     """
-    anomalies = []
     readings = sensor_data.get('readings', {})
     
-    for sensor, reading in readings.items():
-        if sensor in THRESHOLDS:
-            value = reading['value']
-            thresholds = THRESHOLDS[sensor]
-            
-            # Check if value is outside thresholds
-            if value < thresholds['min'] or value > thresholds['max']:
-                severity = "critical" if (value < thresholds['min'] * 0.8 or value > thresholds['max'] * 1.2) else "warning"
-                
-                anomaly = {
-                    'sensor': sensor,
-                    'current_value': value,
-                    'unit': thresholds['unit'],
-                    'expected_range': f"{thresholds['min']} - {thresholds['max']} {thresholds['unit']}",
-                    'severity': severity,
-                    'timestamp': sensor_data.get('timestamp')
-                }
-                
-                # Generate recommendations based on the sensor
-                if sensor == 'oil_pressure':
-                    if value < thresholds['min']:
-                        anomaly['recommendation'] = "Check oil level and refill if necessary. If problem persists, inspect for oil leaks or engine damage."
-                    else:
-                        anomaly['recommendation'] = "High oil pressure detected. Check oil viscosity and possible blockage in the oil system."
-                
-                elif sensor == 'coolant_temp':
-                    if value > thresholds['max']:
-                        anomaly['recommendation'] = "Engine overheating. Check coolant level, radiator function, and water pump. Stop driving if temperature continues to rise."
-                    else:
-                        anomaly['recommendation'] = "Engine temperature too low. Check thermostat function."
-                
-                elif sensor == 'battery_voltage':
-                    if value < thresholds['min']:
-                        anomaly['recommendation'] = "Low battery voltage. Check charging system, alternator, and battery condition."
-                    else:
-                        anomaly['recommendation'] = "High battery voltage. Check voltage regulator and charging system."
-                
-                elif sensor == 'tire_pressure':
-                    if value < thresholds['min']:
-                        anomaly['recommendation'] = "Low tire pressure. Inflate tires to recommended PSI and check for leaks."
-                    else:
-                        anomaly['recommendation'] = "High tire pressure. Reduce to manufacturer recommended PSI."
-                
-                elif sensor == 'brake_pad_thickness':
-                    if value < thresholds['min']:
-                        anomaly['recommendation'] = "Brake pads critically worn. Replace immediately for safety."
-                    
-                elif sensor == 'fuel_pressure':
-                    if value < thresholds['min']:
-                        anomaly['recommendation'] = "Low fuel pressure. Check fuel pump, filter, and pressure regulator."
-                    else:
-                        anomaly['recommendation'] = "High fuel pressure. Inspect pressure regulator and fuel system."
-                
-                elif sensor == 'transmission_temp':
-                    if value > thresholds['max']:
-                        anomaly['recommendation'] = "Transmission overheating. Check fluid level and condition. Avoid towing or heavy loads until resolved."
-                
-                elif sensor == 'oxygen_sensor':
-                    anomaly['recommendation'] = "Oxygen sensor readings out of range. Check for exhaust leaks, fuel mixture issues, or sensor failure."
-                
-                else:
-                    anomaly['recommendation'] = f"Abnormal {sensor} reading. Schedule inspection with a qualified technician."
-                
-                anomalies.append(anomaly)
+    # Check every reading against its thresholds in one pass
+    values = [readings[sensor]['value'] if sensor in readings else np.nan for sensor in SENSOR_ORDER]
+    statuses = classify_readings(np.array(values, dtype=np.float64))
     
-    return anomalies
+    return _anomaly_entries(values, statuses, sensor_data.get('timestamp'))
+
+def get_sensor_data_with_anomalies(vehicle_id: str, condition: str = 'normal') -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Same as get_sensor_data() followed by detect_anomalies(), but classifies the generated
+    readings array directly instead of reading it back out of the sensor data dictionary.
+    
+    Returns:
+        The sensor data and the detected anomalies
+    """
+    values = get_sensor_readings_array(condition)
+    statuses = classify_readings(values)
+    value_list = values.tolist()
+    sensor_data = _sensor_data(vehicle_id, value_list)
+    return sensor_data, _anomaly_entries(value_list, statuses, sensor_data['timestamp'])
+
+# Most vehicles diagnosed in one prompt; response latency grows faster than linearly with prompt length
+AI_BATCH_SIZE = 8
+
+def describe_anomalies(anomalies: List[Dict[str, Any]]) -> str:
+    """Describe each anomaly's reading and expected range for a diagnostic prompt."""
+    issue_description = ""
+    
+    # Add information about each anomaly
+    for anomaly in anomalies:
+        issue_description += f"{anomaly['sensor'].replace('_', ' ').title()}: {anomaly['current_value']} {anomaly['unit']} "
+        issue_description += f"(Expected: {anomaly['expected_range']}). "
+    
+    return issue_description
+
+# AI analyses keyed by vehicle and anomaly signature (which sensors are out of range, and how
+# badly); only real diagnoses go in, never the fallbacks served while Gemini is failing
+ai_analysis_cache = TTLCache(maxsize=1024, ttl=3600)
+ai_analysis_cache_lock = threading.Lock()
+
+def ai_analysis_key(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> Tuple:
+    """Cache key for get_ai_analysis(): brand, model and the sorted (sensor, severity) pairs."""
+    return (
+        vehicle_data.get('brand', ''),
+        vehicle_data.get('model', ''),
+        tuple(sorted((anomaly['sensor'], anomaly['severity']) for anomaly in anomalies))
+    )
+
+@cached(ai_analysis_cache, key=ai_analysis_key, lock=ai_analysis_cache_lock)
+def _primary_ai_analysis(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Diagnose the anomalies, raising instead of falling back if diagnosis fails (so failures aren't cached)"""
+    return generate_primary_diagnostic(
+        describe_anomalies(anomalies), vehicle_data.get('brand', ''), vehicle_data.get('model', ''), detailed=True
+    )
 
 def get_ai_analysis(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -216,18 +317,16 @@ def get_ai_analysis(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]
         model = vehicle_data.get('model', '')
         
         # Construct a detailed prompt for the AI
-        issue_description = ""
-        
-        # Add information about each anomaly
-        for anomaly in anomalies:
-            issue_description += f"{anomaly['sensor'].replace('_', ' ').title()}: {anomaly['current_value']} {anomaly['unit']} "
-            issue_description += f"(Expected: {anomaly['expected_range']}). "
+        issue_description = describe_anomalies(anomalies)
         
         # If we have anomalies, get AI analysis
         if issue_description:
-            # Call OpenAI helper with the constructed prompt
-            ai_response = generate_diagnostic_response(issue_description, brand, model, detailed=True)
-            return ai_response
+            try:
+                return _primary_ai_analysis(vehicle_data, anomalies)
+            except Exception as e:
+                logger.error("Error generating AI diagnosis: %s", e)
+                # Fall back to rule-based diagnostics
+                return generate_fallback_diagnostic(issue_description, brand, model, detailed=True)
         else:
             # No anomalies detected
             return {
@@ -253,7 +352,7 @@ def get_ai_analysis(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]
             }
             
     except Exception as e:
-        logger.error(f"Error generating AI analysis: {e}")
+        logger.error("Error generating AI analysis: %s", e)
         # Return basic analysis in case of error
         return {
             "results": [
@@ -277,6 +376,55 @@ def get_ai_analysis(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]
             ]
         }
 
+def get_ai_analysis_batched(vehicles_with_anomalies: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Generate AI analyses for several vehicles, diagnosing up to AI_BATCH_SIZE of them per prompt.
+    
+    Args:
+        vehicles_with_anomalies: (vehicle_data, anomalies) for each vehicle
+    
+    Returns:
+        AI insights and recommendations for each vehicle, in the same order
+    """
+    analyses = [None] * len(vehicles_with_anomalies)
+    keys = [ai_analysis_key(vehicle_data, anomalies) for vehicle_data, anomalies in vehicles_with_anomalies]
+    with ai_analysis_cache_lock:
+        for position, key in enumerate(keys):
+            analyses[position] = ai_analysis_cache.get(key)
+    
+    # Only uncached vehicles with anomalies need the AI; the rest get the no-anomalies response
+    pending = []
+    for position, (vehicle_data, anomalies) in enumerate(vehicles_with_anomalies):
+        if analyses[position] is not None:
+            continue
+        if anomalies:
+            pending.append(position)
+        else:
+            analyses[position] = get_ai_analysis(vehicle_data, anomalies)
+    
+    for start in range(0, len(pending), AI_BATCH_SIZE):
+        positions = pending[start:start + AI_BATCH_SIZE]
+        issues = []
+        for position in positions:
+            vehicle_data, anomalies = vehicles_with_anomalies[position]
+            issues.append((describe_anomalies(anomalies), vehicle_data.get('brand', ''), vehicle_data.get('model', '')))
+        
+        try:
+            responses = generate_primary_diagnostics(issues, detailed=True)
+        except Exception as e:
+            logger.error("Error generating batched AI diagnosis: %s", e)
+            # Fall back to rule-based diagnostics for each vehicle, and leave them out of the cache
+            for position, (issue_description, brand, model) in zip(positions, issues):
+                analyses[position] = generate_fallback_diagnostic(issue_description, brand, model, detailed=True)
+            continue
+        
+        with ai_analysis_cache_lock:
+            for position, response in zip(positions, responses):
+                analyses[position] = response
+                ai_analysis_cache[keys[position]] = response
+    
+    return analyses
+
 def track_vehicle_patterns(vehicle_id: str, sensor_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Track patterns in vehicle data over time to detect subtle issues.
@@ -316,6 +464,25 @@ def track_vehicle_patterns(vehicle_id: str, sensor_data: Dict[str, Any]) -> Dict
     
     return insights
 
+# Health score components, and the component (index into COMPONENT_NAMES) each sensor's
+# anomalies count against; sensors not listed don't affect the score
+COMPONENT_NAMES = ("engine", "battery", "brakes", "transmission", "tires", "fuel_system", "cooling_system")
+SENSOR_COMPONENTS = {
+    'oil_pressure': 0,
+    'engine_rpm': 0,
+    'battery_voltage': 1,
+    'brake_pad_thickness': 2,
+    'transmission_temp': 3,
+    'tire_pressure': 4,
+    'fuel_pressure': 5,
+    'oxygen_sensor': 5,
+    'coolant_temp': 6
+}
+
+# Lower score bound of each status above "Critical", and the statuses in the same order
+SCORE_BINS = (30, 50, 70, 90)
+SCORE_LABELS = ("Critical", "Poor", "Fair", "Good", "Excellent")
+
 def get_vehicle_health_score(vehicle_data: Dict[str, Any], anomalies: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Calculate an overall health score for the vehicle based on sensor data and anomalies.
@@ -327,57 +494,24 @@ def get_vehicle_health_score(vehicle_data: Dict[str, Any], anomalies: List[Dict[
     Returns:
         Health score and component-specific scores
     """
-    base_score = 100
-    component_scores = {
-        "engine": 100,
-        "battery": 100,
-        "brakes": 100,
-        "transmission": 100,
-        "tires": 100,
-        "fuel_system": 100,
-        "cooling_system": 100
-    }
-    
-    # Reduce scores based on anomalies
-    for anomaly in anomalies:
-        severity_factor = 30 if anomaly['severity'] == 'critical' else 15
-        
-        # Map sensors to components
-        if anomaly['sensor'] == 'oil_pressure' or anomaly['sensor'] == 'engine_rpm':
-            component_scores["engine"] -= severity_factor
-        elif anomaly['sensor'] == 'battery_voltage':
-            component_scores["battery"] -= severity_factor
-        elif anomaly['sensor'] == 'brake_pad_thickness':
-            component_scores["brakes"] -= severity_factor
-        elif anomaly['sensor'] == 'transmission_temp':
-            component_scores["transmission"] -= severity_factor
-        elif anomaly['sensor'] == 'tire_pressure':
-            component_scores["tires"] -= severity_factor
-        elif anomaly['sensor'] == 'fuel_pressure' or anomaly['sensor'] == 'oxygen_sensor':
-            component_scores["fuel_system"] -= severity_factor
-        elif anomaly['sensor'] == 'coolant_temp':
-            component_scores["cooling_system"] -= severity_factor
+    # Penalty per anomaly, accumulated onto the component its sensor belongs to
+    mapped = [anomaly for anomaly in anomalies if anomaly['sensor'] in SENSOR_COMPONENTS]
+    component_indexes = np.fromiter((SENSOR_COMPONENTS[a['sensor']] for a in mapped), dtype=np.int64, count=len(mapped))
+    severity_factors = np.fromiter(
+        (30 if a['severity'] == 'critical' else 15 for a in mapped), dtype=np.int64, count=len(mapped)
+    )
+    penalties = np.zeros(len(COMPONENT_NAMES), dtype=np.int64)
+    np.add.at(penalties, component_indexes, severity_factors)
     
     # Ensure no score goes below zero
-    for component in component_scores:
-        component_scores[component] = max(0, component_scores[component])
+    scores = np.maximum(100 - penalties, 0)
+    component_scores = dict(zip(COMPONENT_NAMES, scores.tolist()))
     
     # Calculate overall score as an average
-    overall_score = sum(component_scores.values()) / len(component_scores)
+    overall_score = float(scores.mean())
     
     # Add descriptions based on scores
-    score_descriptions = {}
-    for component, score in component_scores.items():
-        if score >= 90:
-            score_descriptions[component] = "Excellent"
-        elif score >= 70:
-            score_descriptions[component] = "Good"
-        elif score >= 50:
-            score_descriptions[component] = "Fair"
-        elif score >= 30:
-            score_descriptions[component] = "Poor"
-        else:
-            score_descriptions[component] = "Critical"
+    score_descriptions = {component: get_status_from_score(score) for component, score in component_scores.items()}
     
     return {
         "overall_score": round(overall_score, 1),
@@ -388,31 +522,14 @@ def get_vehicle_health_score(vehicle_data: Dict[str, Any], anomalies: List[Dict[
 
 def get_status_from_score(score: float) -> str:
     """Helper function to convert numerical score to status text"""
-    if score >= 90:
-        return "Excellent"
-    elif score >= 70:
-        return "Good"
-    elif score >= 50:
-        return "Fair"
-    elif score >= 30:
-        return "Poor"
-    else:
-        return "Critical"
+    return SCORE_LABELS[bisect_right(SCORE_BINS, score)]
 
-def get_complete_vehicle_analysis(vehicle_id: str, brand: str, model: str, year: str, condition: Optional[str] = "") -> Dict[str, Any]:
-    """
-    Provide a complete analysis of vehicle health including AI insights and anomaly detection.
-    
-    Args:
-        vehicle_id: The unique identifier for the vehicle
-        brand: The vehicle brand/manufacturer
-        model: The vehicle model
-        year: The vehicle year
-        condition: Optional specific condition to simulate
-    
-    Returns:
-        Complete vehicle analysis with health score, anomalies, and AI insights
-    """
+# Conditions to simulate when none is requested, with a higher chance of normal
+CONDITION_KEYS = tuple(VEHICLE_PATTERNS)
+CONDITION_WEIGHTS = (0.7,) + (0.3 / (len(CONDITION_KEYS) - 1),) * (len(CONDITION_KEYS) - 1)
+
+def _simulate_vehicle(vehicle_id: str, brand: str, model: str, year: str, condition: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]:
+    """Build the vehicle data, simulated sensor readings and detected anomalies for an analysis."""
     # Set vehicle metadata
     vehicle_data = {
         'vehicle_id': vehicle_id,
@@ -424,20 +541,17 @@ def get_complete_vehicle_analysis(vehicle_id: str, brand: str, model: str, year:
     # Get sensor data based on condition (or random condition)
     if not condition:
         # Randomly decide if we'll return normal data or data with an issue
-        conditions = list(VEHICLE_PATTERNS.keys())
-        # Higher chance of normal condition
-        weights = [0.7] + [(0.3/(len(conditions)-1)) for _ in range(len(conditions)-1)]
-        condition = random.choices(conditions, weights=weights, k=1)[0]
+        condition = random.choices(CONDITION_KEYS, weights=CONDITION_WEIGHTS, k=1)[0]
     
-    sensor_data = get_sensor_data(vehicle_id, condition)
+    # Get the sensor data and the anomalies detected in it
+    sensor_data, anomalies = get_sensor_data_with_anomalies(vehicle_id, condition)
     vehicle_data.update(sensor_data)
     
-    # Detect anomalies in the sensor data
-    anomalies = detect_anomalies(sensor_data)
-    
-    # Get AI analysis if anomalies are detected
-    ai_analysis = get_ai_analysis(vehicle_data, anomalies)
-    
+    return vehicle_data, sensor_data, anomalies
+
+def _combine_analysis(vehicle_id: str, vehicle_data: Dict[str, Any], sensor_data: Dict[str, Any],
+                      anomalies: List[Dict[str, Any]], ai_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Add pattern insights and health scores to the AI analysis and combine them into a single response."""
     # Get pattern-based insights
     pattern_insights = track_vehicle_patterns(vehicle_id, sensor_data)
     
@@ -451,4 +565,59 @@ def get_complete_vehicle_analysis(vehicle_id: str, brand: str, model: str, year:
         "anomalies": anomalies,
         "pattern_insights": pattern_insights.get("pattern_insights", []),
         "ai_diagnostics": ai_analysis
-    }
\ No newline at end of file
+    }
+
+def get_complete_vehicle_analysis(vehicle_id: str, brand: str, model: str, year: str, condition: Optional[str] = "") -> Dict[str, Any]:
+    """
+    Provide a complete analysis of vehicle health including AI insights and anomaly detection.
+    
+    Args:
+        vehicle_id: The unique identifier for the vehicle
+        brand: The vehicle brand/manufacturer
+        model: The vehicle model
+        year: The vehicle year
+        condition: Optional specific condition to simulate
+    
+    Returns:
+        Complete vehicle analysis with health score, anomalies, and AI insights
+    """
+    vehicle_data, sensor_data, anomalies = _simulate_vehicle(vehicle_id, brand, model, year, condition)
+    
+    # Get AI analysis if anomalies are detected
+    ai_analysis = get_ai_analysis(vehicle_data, anomalies)
+    
+    return _combine_analysis(vehicle_id, vehicle_data, sensor_data, anomalies, ai_analysis)
+
+def analyze_fleet_threaded(vehicles: List[Dict[str, Any]], max_workers: int = 16) -> List[Dict[str, Any]]:
+    """
+    Analyze several vehicles, batching their AI analyses into shared prompts run in a thread pool.
+    
+    Args:
+        vehicles: Keyword arguments for get_complete_vehicle_analysis() for each vehicle
+        max_workers: Most Gemini requests in flight at once (each covers up to AI_BATCH_SIZE
+            vehicles); lower it if fleet requests run into the API key's rate limit
+    
+    Returns:
+        The complete analyses, in the same order as vehicles
+    """
+    simulated = [
+        (vehicle['vehicle_id'], *_simulate_vehicle(vehicle['vehicle_id'], vehicle['brand'], vehicle['model'],
+                                                   vehicle['year'], vehicle.get('condition', "")))
+        for vehicle in vehicles
+    ]
+    vehicles_with_anomalies = [(vehicle_data, anomalies) for _, vehicle_data, _, anomalies in simulated]
+    batches = [vehicles_with_anomalies[start:start + AI_BATCH_SIZE]
+               for start in range(0, len(vehicles_with_anomalies), AI_BATCH_SIZE)]
+    
+    # Each batch is one prompt; with more than one, run the prompts concurrently
+    if len(batches) <= 1:
+        batch_analyses = [get_ai_analysis_batched(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            batch_analyses = list(executor.map(get_ai_analysis_batched, batches))
+    ai_analyses = [analysis for analyses in batch_analyses for analysis in analyses]
+    
+    return [
+        _combine_analysis(vehicle_id, vehicle_data, sensor_data, anomalies, ai_analysis)
+        for (vehicle_id, vehicle_data, sensor_data, anomalies), ai_analysis in zip(simulated, ai_analyses)
+    ]
@@ -0,0 +1,66 @@
+"""
+Haversine distance kernels for nearest-location lookups, compiled with Numba when available
+"""
+import logging
+import math
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius used for Haversine distances
+EARTH_RADIUS_KM = 6371.0
+
+# Try to import Numba for JIT-compiled kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    logger.warning("Numba module import failed. Using NumPy distance kernels.")
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    # Explicit signatures compile at import (or load from the on-disk cache); the kernels are
+    # serial since nearest.py only sends them small point sets, where a thread pool costs more
+    # than the loop
+    @njit('f8(f8,f8,f8,f8)', fastmath=True, cache=True)
+    def haversine_km(lat1, lon1, lat2, lon2):
+        """Great-circle distance in km between two points given in degrees."""
+        phi1 = math.radians(lat1)
+        phi2 = math.radians(lat2)
+        dphi = phi2 - phi1
+        dlmb = math.radians(lon2 - lon1)
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    @njit('Tuple((i8,f8))(f8,f8,f8[:],f8[:])', fastmath=True, cache=True)
+    def argmin_haversine(lat0, lon0, lats, lons):
+        """Index of and distance in km to the point in lats/lons closest to (lat0, lon0)."""
+        idx = 0
+        best = np.inf
+        for i in range(lats.shape[0]):
+            distance = haversine_km(lat0, lon0, lats[i], lons[i])
+            if distance < best:
+                idx = i
+                best = distance
+        return idx, best
+else:
+    def haversine_km(lat1, lon1, lat2, lon2):
+        """Great-circle distance in km between two points given in degrees."""
+        phi1 = math.radians(lat1)
+        phi2 = math.radians(lat2)
+        dphi = phi2 - phi1
+        dlmb = math.radians(lon2 - lon1)
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def argmin_haversine(lat0, lon0, lats, lons):
+        """Index of and distance in km to the point in lats/lons closest to (lat0, lon0)."""
+        lat1, lon1 = np.deg2rad(lat0), np.deg2rad(lon0)
+        lat2, lon2 = np.deg2rad(lats), np.deg2rad(lons)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        idx = int(distances.argmin())
+        return idx, distances[idx]
@@ -6,7 +6,7 @@ import json
 import logging
 import random
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,7 +42,7 @@ try:
                 GEMINI_AVAILABLE = True
             except Exception as test_error:
                 error_msg = str(test_error)
-                logger.warning(f"Gemini API test failed: {error_msg}")
+                logger.warning("Gemini API test failed: %s", error_msg)
                 
                 # Check for model availability error
                 if "is not found" in error_msg:
@@ -53,13 +53,13 @@ try:
                         logger.info("Gemini API test successful with alternative model")
                         GEMINI_AVAILABLE = True
                     except Exception as alt_error:
-                        logger.warning(f"Alternative model test failed: {alt_error}")
+                        logger.warning("Alternative model test failed: %s", alt_error)
                         GEMINI_AVAILABLE = False
                 else:
                     GEMINI_AVAILABLE = False
                 
         except Exception as e:
-            logger.error(f"Error initializing Google Gemini client: {e}")
+            logger.error("Error initializing Google Gemini client: %s", e)
             GEMINI_AVAILABLE = False
     else:
         logger.warning("Google API key not found in environment variables")
@@ -210,20 +210,31 @@ def generate_diagnostic_response(issue_description: str, brand: str = "", model:
         Dictionary containing diagnostic information
     """
     try:
-        # If Gemini API is available, use it
-        if has_gemini_access:
-            try:
-                return generate_gemini_diagnostic(issue_description, brand, model, detailed)
-            except Exception as e:
-                logger.error(f"Error using Gemini API: {e}")
-                # Fall back to rule-based diagnostics if Gemini fails
-                logger.info("Falling back to rule-based diagnostics")
-        
+        return generate_primary_diagnostic(issue_description, brand, model, detailed)
+    except Exception as e:
+        logger.error("Error generating diagnostic response: %s", e)
+        # Fall back to rule-based diagnostics if Gemini fails
+        logger.info("Falling back to rule-based diagnostics")
+        return generate_fallback_diagnostic(issue_description, brand, model, detailed)
+
+def generate_primary_diagnostic(issue_description: str, brand: str = "", model: str = "", detailed: bool = False) -> Dict[str, Any]:
+    """
+    Like generate_diagnostic_response(), but raises instead of falling back when diagnosis fails,
+    so callers can tell a real diagnosis from a fallback one (rule-based diagnostics are the real
+    diagnosis when no Gemini API key is configured)
+    """
+    if has_gemini_access:
+        return generate_gemini_diagnostic(issue_description, brand, model, detailed)
+    return generate_rule_based_diagnostic(issue_description, brand, model, detailed)
+
+def generate_fallback_diagnostic(issue_description: str, brand: str = "", model: str = "", detailed: bool = False) -> Dict[str, Any]:
+    """Generate a rule-based diagnostic response, or a basic one if that fails too"""
+    try:
         # Use rule-based diagnostics
         return generate_rule_based_diagnostic(issue_description, brand, model, detailed)
         
     except Exception as e:
-        logger.error(f"Error generating diagnostic response: {e}")
+        logger.error("Error generating diagnostic response: %s", e)
         # Return basic fallback response in case of errors
         return {
             "results": [
@@ -242,6 +253,133 @@ def generate_diagnostic_response(issue_description: str, brand: str = "", model:
             "maintenance_tips": random.sample(MAINTENANCE_TIPS, 3)
         }
 
+def generate_diagnostic_responses(issues: List[Tuple[str, str, str]], detailed: bool = False) -> List[Dict[str, Any]]:
+    """
+    Generate diagnostic responses for several vehicles, with one Gemini request for all of them
+    
+    Args:
+        issues: (issue_description, brand, model) for each vehicle
+        detailed: Whether to return detailed responses
+    
+    Returns:
+        One diagnostic dictionary per issue, in the same order
+    """
+    try:
+        return generate_primary_diagnostics(issues, detailed)
+    except Exception as e:
+        logger.error("Error generating diagnostic responses: %s", e)
+        # Fall back to rule-based diagnostics for each issue if Gemini fails
+        logger.info("Falling back to rule-based diagnostics")
+        return [generate_fallback_diagnostic(issue_description, brand, model, detailed)
+                for issue_description, brand, model in issues]
+
+def generate_primary_diagnostics(issues: List[Tuple[str, str, str]], detailed: bool = False) -> List[Dict[str, Any]]:
+    """Like generate_diagnostic_responses(), but raises instead of falling back when diagnosis fails"""
+    if has_gemini_access and issues:
+        return generate_gemini_batch_diagnostic(issues)
+    return [generate_rule_based_diagnostic(issue_description, brand, model, detailed)
+            for issue_description, brand, model in issues]
+
+def _select_gemini_model(generation_config: Dict[str, Any]):
+    """Return the first Gemini model that answers a test request, falling back to gemini-pro."""
+    try:
+        # No need to list models, just try models in order
+        model_names_to_try = ["gemini-pro", "gemini-1.0-pro", "gemini-1.5-pro"]
+        model = None
+        last_error = None
+        
+        for model_name in model_names_to_try:
+            try:
+                logger.info("Attempting to use model: %s", model_name)
+                model = gemini_client.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config
+                )
+                # Test if this model works
+                test_response = model.generate_content("Test")
+                logger.info("Successfully connected to model: %s", model_name)
+                break  # Found a working model, exit the loop
+            except Exception as e:
+                logger.warning("Model %s failed: %s", model_name, e)
+                last_error = e
+                continue  # Try next model
+        
+        # If all models failed, raise the last error
+        if model is None:
+            if last_error:
+                raise last_error
+            else:
+                raise Exception("All Gemini models failed to initialize")
+        return model
+    except Exception as model_error:
+        logger.error("Error selecting model: %s", model_error)
+        # Fall back to a simple known model
+        logger.info("Falling back to default model: gemini-pro")
+        return gemini_client.GenerativeModel(
+            model_name="gemini-pro",
+            generation_config=generation_config
+        )
+
+def _parse_gemini_json(result_text: str) -> Any:
+    """Parse a JSON model response, stripping any code block markers around it."""
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+    return json.loads(result_text)
+
+def _complete_diagnostic(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Ensure a parsed diagnostic has the expected structure."""
+    if "results" not in result:
+        result["results"] = []
+    if "follow_up_questions" not in result:
+        result["follow_up_questions"] = []
+    if "maintenance_tips" not in result:
+        result["maintenance_tips"] = []
+    return result
+
+def _raise_gemini_error(e: Exception):
+    """Re-raise a Gemini API error, with clearer messages for quota and API key problems."""
+    error_str = str(e)
+    
+    # Handle specific error types with better messaging
+    if "quota" in error_str.lower():
+        logger.error("Google Gemini API quota exceeded. Using fallback diagnostics.")
+        # For quota issues, raise a specific exception type that's easily identifiable
+        raise Exception("QUOTA_EXCEEDED: Google Gemini API quota has been reached. The system will use built-in diagnostics until the quota resets.")
+    elif "invalid" in error_str.lower() and "api key" in error_str.lower():
+        logger.error("Invalid API key configuration")
+        raise Exception("Invalid Google API key. Please check your API key configuration.")
+    else:
+        # For other errors, just pass through the original exception
+        raise e
+
+def _check_gemini_client():
+    """Raise if the Gemini client isn't usable."""
+    if gemini_client is None:
+        logger.error("Google Gemini client not initialized")
+        raise Exception("Google Gemini client not initialized")
+        
+    # Check if API key is valid
+    if not GOOGLE_API_KEY:
+        logger.warning("No Google API key provided")
+        raise Exception("Invalid Google API key configuration")
+
+# Response fields requested from Gemini for each diagnosed issue
+DIAGNOSTIC_SCHEMA_PROMPT = """
+        1. results: array of potential issues, each containing:
+           - problem: clear name of the identified problem
+           - problem_severity: severity level ("Critical", "Warning", or "Minor")
+           - solution: detailed explanation and repair instructions
+           - estimated_cost: cost range for repairs
+           - diy_possible: boolean indicating if it's a DIY repair
+           - time_estimate: optional time required for repairs
+        
+        2. follow_up_questions: array of 2-3 relevant questions to further diagnose the issue
+        
+        3. maintenance_tips: array of 3-5 maintenance recommendations related to this issue
+"""
+
 def generate_gemini_diagnostic(issue_description: str, brand: str, model: str, detailed: bool) -> Dict[str, Any]:
     """
     Generate diagnostic response using Google Gemini API
@@ -256,16 +394,7 @@ def generate_gemini_diagnostic(issue_description: str, brand: str, model: str, d
         Dictionary containing AI-generated diagnostic information
     """
     try:
-        # Use the global client that was initialized earlier
-        global gemini_client
-        if gemini_client is None:
-            logger.error("Google Gemini client not initialized")
-            raise Exception("Google Gemini client not initialized")
-            
-        # Check if API key is valid
-        if not GOOGLE_API_KEY:
-            logger.warning("No Google API key provided")
-            raise Exception("Invalid Google API key configuration")
+        _check_gemini_client()
         
         # Configure the model
         generation_config = {
@@ -276,106 +405,76 @@ def generate_gemini_diagnostic(issue_description: str, brand: str, model: str, d
         }
         
         # Try different Gemini model names
-        try:
-            # No need to list models, just try models in order
-            model_names_to_try = ["gemini-pro", "gemini-1.0-pro", "gemini-1.5-pro"]
-            model = None
-            last_error = None
-            
-            for model_name in model_names_to_try:
-                try:
-                    logger.info(f"Attempting to use model: {model_name}")
-                    model = gemini_client.GenerativeModel(
-                        model_name=model_name,
-                        generation_config=generation_config
-                    )
-                    # Test if this model works
-                    test_response = model.generate_content("Test")
-                    logger.info(f"Successfully connected to model: {model_name}")
-                    break  # Found a working model, exit the loop
-                except Exception as e:
-                    logger.warning(f"Model {model_name} failed: {e}")
-                    last_error = e
-                    continue  # Try next model
-            
-            # If all models failed, raise the last error
-            if model is None:
-                if last_error:
-                    raise last_error
-                else:
-                    raise Exception("All Gemini models failed to initialize")
-        except Exception as model_error:
-            logger.error(f"Error selecting model: {model_error}")
-            # Fall back to a simple known model
-            logger.info("Falling back to default model: gemini-pro")
-            model = gemini_client.GenerativeModel(
-                model_name="gemini-pro",
-                generation_config=generation_config
-            )
+        gemini_model = _select_gemini_model(generation_config)
         
         # Construct prompt
         prompt = f"""
         You are an expert automotive diagnostic assistant specializing in identifying car problems and providing solutions.
         
         Analyze the vehicle issue description for a {brand} {model} and provide a detailed assessment with the following information in JSON format:
-        
-        1. results: array of potential issues, each containing:
-           - problem: clear name of the identified problem
-           - problem_severity: severity level ("Critical", "Warning", or "Minor")
-           - solution: detailed explanation and repair instructions
-           - estimated_cost: cost range for repairs
-           - diy_possible: boolean indicating if it's a DIY repair
-           - time_estimate: optional time required for repairs
-        
-        2. follow_up_questions: array of 2-3 relevant questions to further diagnose the issue
-        
-        3. maintenance_tips: array of 3-5 maintenance recommendations related to this issue
-        
+        {DIAGNOSTIC_SCHEMA_PROMPT}
         Issue description: {issue_description}
         
         Return ONLY valid JSON without any additional text, markdown formatting, or code blocks.
         """
         
         # Make the API call
-        response = model.generate_content(prompt)
+        response = gemini_model.generate_content(prompt)
         
-        # Extract the content
-        result_text = response.text
+        # Parse the JSON and ensure the response has the expected structure
+        return _complete_diagnostic(_parse_gemini_json(response.text))
         
-        # Clean any potential code block markers
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
+    except Exception as e:
+        logger.error("Error generating Google Gemini diagnostic: %s", e)
+        _raise_gemini_error(e)
+
+def generate_gemini_batch_diagnostic(issues: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """
+    Diagnose several vehicles with a single Google Gemini request
+    
+    Args:
+        issues: (issue_description, brand, model) for each vehicle
+    
+    Returns:
+        One diagnostic dictionary per issue, in the same order
+    """
+    try:
+        _check_gemini_client()
         
-        # Parse the JSON
-        result = json.loads(result_text)
+        # Output grows with the number of vehicles in the prompt
+        generation_config = {
+            "temperature": 0.4,
+            "top_p": 0.8,
+            "top_k": 40,
+            "max_output_tokens": min(1024 * len(issues), 8192),
+        }
+        gemini_model = _select_gemini_model(generation_config)
         
-        # Ensure the response has the expected structure
-        if "results" not in result:
-            result["results"] = []
-        if "follow_up_questions" not in result:
-            result["follow_up_questions"] = []
-        if "maintenance_tips" not in result:
-            result["maintenance_tips"] = []
+        vehicle_lines = "\n".join(
+            f"        Vehicle {number}: {brand} {model}. Issue description: {issue_description}"
+            for number, (issue_description, brand, model) in enumerate(issues, 1)
+        )
+        prompt = f"""
+        You are an expert automotive diagnostic assistant specializing in identifying car problems and providing solutions.
         
-        return result
+        Analyze the issue descriptions of the {len(issues)} vehicles below. For each vehicle, provide a detailed assessment as a JSON object with the following information:
+        {DIAGNOSTIC_SCHEMA_PROMPT}
+{vehicle_lines}
         
-    except Exception as e:
-        error_str = str(e)
-        logger.error(f"Error generating Google Gemini diagnostic: {e}")
+        Return ONLY a valid JSON array with exactly {len(issues)} objects, one per vehicle in the order listed, without any additional text, markdown formatting, or code blocks.
+        """
+        
+        # Make the API call
+        response = gemini_model.generate_content(prompt)
         
-        # Handle specific error types with better messaging
-        if "quota" in error_str.lower():
-            logger.error("Google Gemini API quota exceeded. Using fallback diagnostics.")
-            # For quota issues, raise a specific exception type that's easily identifiable
-            raise Exception("QUOTA_EXCEEDED: Google Gemini API quota has been reached. The system will use built-in diagnostics until the quota resets.")
-        elif "invalid" in error_str.lower() and "api key" in error_str.lower():
-            logger.error("Invalid API key configuration")
-            raise Exception("Invalid Google API key. Please check your API key configuration.")
-        else:
-            # For other errors, just pass through the original exception
-            raise e
+        result = _parse_gemini_json(response.text)
+        if not isinstance(result, list) or len(result) != len(issues):
+            raise Exception(f"Expected a JSON array of {len(issues)} diagnostics")
+        return [_complete_diagnostic(item) for item in result]
+        
+    except Exception as e:
+        logger.error("Error generating Google Gemini batch diagnostic: %s", e)
+        _raise_gemini_error(e)
 
 def generate_rule_based_diagnostic(issue_description: str, brand: str, model: str, detailed: bool) -> Dict[str, Any]:
     """
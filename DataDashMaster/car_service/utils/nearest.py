@@ -0,0 +1,38 @@
+"""
+Nearest-location lookups backed by a haversine BallTree, falling back to a linear scan
+"""
+import logging
+
+import numpy as np
+
+from utils.distance_numba import EARTH_RADIUS_KM, argmin_haversine
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Below this many points a linear haversine scan beats building and querying a tree
+BALLTREE_MIN_POINTS = 1000
+
+# Try to import scikit-learn for the BallTree
+try:
+    from sklearn.neighbors import BallTree
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    logger.warning("scikit-learn module import failed. Using linear nearest-location search.")
+    SKLEARN_AVAILABLE = False
+
+
+def build_location_index(lats, lons):
+    """Build a BallTree over the given coordinates, or None when a linear scan is cheaper."""
+    if not SKLEARN_AVAILABLE or len(lats) < BALLTREE_MIN_POINTS:
+        return None
+    return BallTree(np.radians(np.column_stack((lats, lons))), metric="haversine", leaf_size=40)
+
+
+def nearest_location(index, lat, lon, lats, lons):
+    """Return (position, distance_km) of the coordinate closest to (lat, lon)."""
+    if index is not None:
+        distances, positions = index.query(np.radians([[lat, lon]]), k=1)
+        return int(positions[0, 0]), float(distances[0, 0]) * EARTH_RADIUS_KM
+    idx, distance = argmin_haversine(lat, lon, lats, lons)
+    return int(idx), float(distance)
@@ -1,13 +1,25 @@
+# The app is preloaded in the master (below), so patch before anything else is imported:
+# ssl, threading locks and the app's thread pools must be the gevent versions the workers use
+from gevent import monkey
+monkey.patch_all()
+
 import os
 
 # The socket to bind
 bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
 
-# Number of worker processes
-workers = 4
+# Number of worker processes (database.py splits its connection budget across the
+# same count, so override both through WEB_CONCURRENCY)
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1) + 1))
+
+# Cooperative gevent workers so IO-bound requests (DB, LLM calls) don't block each other
+worker_class = "gevent"
+
+# Maximum simultaneous clients per gevent worker
+worker_connections = 1000
 
-# Number of threads per worker
-threads = 2
+# Import the app once in the master and fork workers from it (already monkey-patched above)
+preload_app = True
 
 # Timeout in seconds
 timeout = 60
@@ -26,4 +38,17 @@ reload = False  # Set to False for production
 pythonpath = "car_service"
 
 # The WSGI application
-wsgi_app = "app:app"
\ No newline at end of file
+wsgi_app = "app:app"
+
+def post_fork(server, worker):
+    """Make the forked worker's database access greenlet-safe."""
+    # Let psycopg2 yield to other greenlets while waiting on Postgres
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        server.log.warning("psycogreen not installed; Postgres calls will block the gevent worker")
+
+    # Connections opened in the master must not be shared with the workers
+    from database import engine
+    engine.dispose(close=False)